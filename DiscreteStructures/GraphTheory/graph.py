@@ -1,10 +1,14 @@
 from __future__ import annotations
-from collections import defaultdict
-from typing import Union, Optional
+from array import array
+from collections import defaultdict, deque
+from typing import Callable, Iterator, Union, Optional
+import heapq
+import itertools
 import warnings
 
 import os
 import sys
+import uuid
 
 # Try to import linear algebra
 la_available: bool
@@ -18,15 +22,55 @@ except ImportError:
     la_available = False
     warnings.warn("Failed to load linear_alg. Some functionality may be unavailable", ImportWarning)
 
+# NumPy is optional, it's only used by `Graph.adjacency_array`
+np_available: bool
+try:
+    import numpy as np
+    np_available = True
+except ImportError:
+    np_available = False
+
+
+# Default `Vertex.key`s are a random per-process prefix plus a counter, so they
+# never collide with keys from another run or process (pickled graphs, workers)
+_vertex_keys = itertools.count()
+_vertex_key_prefix = uuid.uuid4().int << 64
+
+def _reset_vertex_keys() -> None:
+    # Forked children inherit the parent's counter, so give them their own prefix
+    global _vertex_keys, _vertex_key_prefix
+    _vertex_keys = itertools.count()
+    _vertex_key_prefix = uuid.uuid4().int << 64
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_vertex_keys)
 
 class Vertex:
     """
-    `name` is just there to be nice. The important part of a Vertex is its id
+    `name` is just there to be nice. The important part of a Vertex is its `key`
+
+    Vertices are equal (and hash the same) when their keys are, so a vertex that
+    was pickled and loaded in another process is still the same vertex. Default
+    keys are unique across processes but random; pass `key` (ints, or strings,
+    but not both in one graph) to get a reproducible ordering.
     """
+    __slots__ = ("name", "key")
     name: str
+    key: Union[int, str]
 
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, key: Union[int, str, None] = None) -> None:
         self.name = name
+        if key == None:
+            key = _vertex_key_prefix | next(_vertex_keys)
+        elif not isinstance(key, (int, str)):
+            raise ValueError(f"Vertex key must be an int or a str, not {type(key).__name__}")
+        self.key = key
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Vertex) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
 
     def __repr__(self) -> str:
         return f"Vertex({self.name})"
@@ -38,23 +82,36 @@ class Vertex:
 class Edge:
     """An edge between `v1` and `v2`
 
-    If `directed` is `False`, `id(v1)` will always be less than `id(v2)` so an
-    there should only be one possible representation of an edge between two points
+    If `directed` is `False`, `v1.key` will always be less than `v2.key` so an
+    there should only be one possible representation of an edge between two points.
+    That order (and the hash, which is computed once) only depends on the vertex
+    keys, so it is the same in every process the vertices are pickled to.
     """
+    __slots__ = ("_v1", "_v2", "_directed", "_hash")
 
     _v1: Vertex
     _v2: Vertex
     _directed: bool
+    _hash: int
 
     def __init__(self, v1: Vertex, v2: Vertex, directed: bool = False):
         self._directed = directed
 
         if not self._directed:
-            if id(v2) < id(v1):
-                (v1, v2) = (v2, v1)
+            try:
+                if v2.key < v1.key:
+                    (v1, v2) = (v2, v1)
+            except TypeError:
+                raise ValueError(f"Can't connect {v1!r} and {v2!r}: int and str vertex keys can't be "
+                    "mixed (vertices without an explicit key get int keys)") from None
 
         self._v1 = v1
         self._v2 = v2
+        self._hash = hash((v1.key, v2.key, directed))
+
+    def __reduce__(self):
+        # Rebuild instead of copying `_hash`: str keys hash differently in other processes
+        return (Edge, (self._v1, self._v2, self._directed))
     
     @property
     def v1(self) -> Vertex: return self._v1
@@ -76,12 +133,14 @@ class Edge:
         return f"Edge({self.v1}, {self.v2}, {self.directed})"
     
     def __eq__(self, other) -> bool:
+        if self is other: return True
         if isinstance(other, Edge):
-            return self.v1 == other.v1 and self.v2 == other.v2 and self.directed == other.directed
+            return self._hash == other._hash and self._v1.key == other._v1.key \
+                and self._v2.key == other._v2.key and self._directed == other._directed
         return False
 
     def __hash__(self) -> int:
-        return hash((self.v1, self.v2, self.directed,))
+        return self._hash
     
     def is_loop(self) -> bool:
         return self.v1 == self.v2
@@ -97,12 +156,26 @@ class Edge:
 class Graph:
     """Constructs a graph with `vertices` and `edges`
 
+    Besides `edges` (edge -> multiplicity) the graph keeps an adjacency index of
+    the edges leaving and entering every vertex, so `neighbors`, `degree`,
+    `incident_edges` and `remove_vertex` are O(degree) instead of scanning every
+    edge. Change the edges through the methods (not `edges` directly) so the
+    index stays in sync.
+
     TODO: actually write documentation lol
     """
     vertices: set[Vertex]
     edges: defaultdict[Edge,int]
     simple: bool
     directed: bool
+    # Vertex -> the edges leaving/entering it (dicts used as ordered sets). An
+    # undirected edge is in both for both of its endpoints
+    _out: dict[Vertex, dict[Edge, None]]
+    _in: dict[Vertex, dict[Edge, None]]
+    # Default vertex order of the adjacency exports, rebuilt when vertices change,
+    # and the adjacency triplets in that order, rebuilt when anything changes
+    _vertex_order: Optional[dict[Vertex, int]]
+    _coo: Optional[tuple[array, array, array]]
 
     def __init__(self,
         vertices: Optional[set[Vertex]] = None,
@@ -124,7 +197,31 @@ class Graph:
         if (isinstance(edges, set)): # Convert the set into a dict
             edges = {e:1 for e in edges}
         
-        self.edges = defaultdict(lambda: 0, edges)
+        self.edges = defaultdict(int, edges)
+        self._rebuild_index()
+        self._vertex_order = None
+
+    def _rebuild_index(self) -> None:
+        self._out = {}
+        self._in = {}
+        self._coo = None
+        for edge, multiplicity in self.edges.items():
+            if multiplicity > 0: self._index_edge(edge)
+
+    def _index_edge(self, edge: Edge) -> None:
+        self._coo = None
+        v1, v2 = edge._v1, edge._v2
+        self._out.setdefault(v1, {})[edge] = None
+        self._in.setdefault(v2, {})[edge] = None
+        if not edge._directed:
+            self._out.setdefault(v2, {})[edge] = None
+            self._in.setdefault(v1, {})[edge] = None
+
+    def _unindex_edge(self, edge: Edge) -> None:
+        self._coo = None
+        for index, vertex in ((self._out, edge.v1), (self._in, edge.v2), (self._out, edge.v2), (self._in, edge.v1)):
+            incident = index.get(vertex)
+            if incident != None: incident.pop(edge, None)
     
     def __str__(self):
         return "({" + ", ".join(map(str, self.vertices)) + "}, {" + ", ".join(map(str, self.edges)) + "})"
@@ -133,26 +230,66 @@ class Graph:
         return vertex in self.vertices
     
     def add_vertex(self, vertex: Vertex) -> None:
+        if vertex not in self.vertices: self._vertex_order = None
         self.vertices.add(vertex)
     
     def remove_vertex(self, vertex: Vertex, remove_hanging_edges: bool = True) -> None:
         if remove_hanging_edges:
-            for edge in list(self.edges.keys()):
-                if edge.has_vertex(vertex):
-                    del self.edges[edge]
+            for edge in self.incident_edges(vertex):
+                del self.edges[edge]
+                self._unindex_edge(edge)
+            self._out.pop(vertex, None)
+            self._in.pop(vertex, None)
 
         self.vertices.remove(vertex)
+        self._vertex_order = None
 
     def has_edge(self, edge: Edge) -> bool:
         """Checks if `edge` is in the graph"""
 
-        if self.edges[edge] > 0: return True
+        # .get so checking doesn't add a 0 entry to the defaultdict
+        if self.edges.get(edge, 0) > 0: return True
         return False
     
     def add_edge(self, edge: Edge) -> None:
         """Add an edge to the graph"""
 
+        if not self.has_edge(edge): self._index_edge(edge)
         self.edges[edge] += 1
+        self._coo = None
+
+    def neighbors(self, vertex: Vertex) -> dict[Vertex, int]:
+        """The vertices `vertex` has edges to, with the number of edges to each. O(degree)
+
+        For directed edges these are the out-neighbors, see `predecessors`
+        """
+        res = {}
+        for edge in self._out.get(vertex, ()):
+            other = edge.v2 if edge.v1 == vertex else edge.v1
+            res[other] = res.get(other, 0) + self.edges[edge]
+        return res
+
+    def predecessors(self, vertex: Vertex) -> dict[Vertex, int]:
+        """The vertices with edges to `vertex`, with the number of edges from each. O(degree)"""
+        res = {}
+        for edge in self._in.get(vertex, ()):
+            other = edge.v1 if edge.v2 == vertex else edge.v2
+            res[other] = res.get(other, 0) + self.edges[edge]
+        return res
+
+    def incident_edges(self, vertex: Vertex) -> list[Edge]:
+        """Every edge with `vertex` as an endpoint (once each, whatever its multiplicity). O(degree)"""
+        return list({**self._out.get(vertex, {}), **self._in.get(vertex, {})})
+
+    def out_degree(self, vertex: Vertex) -> int:
+        return sum(self.edges[edge] for edge in self._out.get(vertex, ()))
+
+    def in_degree(self, vertex: Vertex) -> int:
+        return sum(self.edges[edge] for edge in self._in.get(vertex, ()))
+
+    def degree(self, vertex: Vertex) -> int:
+        """Number of edge endpoints at `vertex` (loops count twice), counting multiplicity. O(degree)"""
+        return sum(self.edges[edge] * (2 if edge.is_loop() else 1) for edge in self.incident_edges(vertex))
     
     def add_edge_safe(self, edge: Edge, convert: bool=False) -> bool:
         """Add an edge to the graph if the edge is valid.
@@ -170,35 +307,231 @@ class Graph:
             if edge.is_loop(): return False
             if self.has_edge(edge): return False # no parallel edges
 
-        self.edges[edge] += 1
+        self.add_edge(edge)
         return True
 
     def remove_edge(self, edge: Edge, remove_all: bool = False) -> None:
-        if remove_all or self.edges[edge] <= 1: del self.edges[edge]
-        else: self.edges[edge] -= 1
+        if remove_all or self.edges[edge] <= 1:
+            del self.edges[edge]
+            self._unindex_edge(edge)
+        else:
+            self.edges[edge] -= 1
+            self._coo = None
+
+    def _successors(self, vertex: Vertex) -> Iterator[tuple[Vertex, Edge]]:
+        """(neighbor, edge) for every edge leaving `vertex`"""
+        for edge in self._out.get(vertex, ()):
+            yield (edge.v2 if edge.v1 == vertex else edge.v1), edge
+
+    def bfs(self, start: Vertex) -> Iterator[tuple[Vertex, int]]:
+        """Breadth-first search from `start`, yielding (vertex, distance in edges) as they're reached
+
+        Follows edges in their direction. Stop iterating whenever you've seen enough
+        """
+        distances = {start: 0}
+        queue = deque([start])
+        while queue:
+            vertex = queue.popleft()
+            yield vertex, distances[vertex]
+            for other, _ in self._successors(vertex):
+                if other not in distances:
+                    distances[other] = distances[vertex] + 1
+                    queue.append(other)
+
+    def dfs(self, start: Vertex) -> Iterator[Vertex]:
+        """Depth-first search from `start`, yielding vertices in preorder
+
+        Iterative (with an explicit stack of neighbor iterators) so deep graphs
+        don't hit the recursion limit
+        """
+        visited = {start}
+        yield start
+        stack = [self._successors(start)]
+        while stack:
+            for other, _ in stack[-1]:
+                if other not in visited:
+                    visited.add(other)
+                    yield other
+                    stack.append(self._successors(other))
+                    break
+            else:
+                stack.pop()
+
+    def connected_components(self) -> Iterator[set[Vertex]]:
+        """Yields the vertex set of every connected component
+
+        Edge directions are ignored, so for directed graphs these are the weakly
+        connected components
+        """
+        seen = set()
+        for vertex in self._all_vertices():
+            if vertex in seen: continue
+            component = {vertex}
+            stack = [vertex]
+            while stack:
+                v = stack.pop()
+                for index in (self._out, self._in):
+                    for edge in index.get(v, ()):
+                        other = edge.v2 if edge.v1 == v else edge.v1
+                        if other not in component:
+                            component.add(other)
+                            stack.append(other)
+            seen |= component
+            yield component
+
+    def topological_sort(self) -> Iterator[Vertex]:
+        """Yields the vertices so every edge goes from an earlier to a later one (Kahn's algorithm)
+
+        Raises `ValueError` once it gets stuck on a cycle
+        """
+        assert self.directed, "Only directed graphs have a topological order"
+        vertices = self._all_vertices()
+        in_degree = {v: self.in_degree(v) for v in vertices}
+        ready = deque(v for v in vertices if in_degree[v] == 0)
+        count = 0
+        while ready:
+            vertex = ready.popleft()
+            count += 1
+            yield vertex
+            for other, edge in self._successors(vertex):
+                in_degree[other] -= self.edges[edge]
+                if in_degree[other] == 0: ready.append(other)
+        if count < len(vertices):
+            raise ValueError("Graph has a cycle so it has no topological order")
+
+    def dijkstra(self, source: Vertex, weight: Optional[Callable[[Edge], float]] = None) -> Iterator[tuple[Vertex, float, Optional[Vertex]]]:
+        """Yields (vertex, distance, previous vertex on a shortest path) in order of distance from `source`
+
+        `weight` gives the length of an edge (default 1 for every edge) and must not
+        be negative. Uses a binary heap with lazy deletion, O((V + E) log V). Each
+        vertex is final when it's yielded, so you can stop at your target
+        """
+        if weight == None: weight = lambda edge: 1
+        distances = {source: 0}
+        previous = {source: None}
+        done = set()
+        counter = itertools.count() # Tie-breaker so vertices are never compared
+        heap = [(0, next(counter), source)]
+        while heap:
+            distance, _, vertex = heapq.heappop(heap)
+            if vertex in done: continue
+            done.add(vertex)
+            yield vertex, distance, previous[vertex]
+            for other, edge in self._successors(vertex):
+                w = weight(edge)
+                if w < 0: raise ValueError(f"Negative weight {w} on {edge}")
+                new_distance = distance + w
+                if other not in done and (other not in distances or new_distance < distances[other]):
+                    distances[other] = new_distance
+                    previous[other] = vertex
+                    heapq.heappush(heap, (new_distance, next(counter), other))
+
+    def shortest_path(self, source: Vertex, target: Vertex, weight: Optional[Callable[[Edge], float]] = None) -> Optional[list[Vertex]]:
+        """The vertices of a shortest path from `source` to `target`, or `None` if there isn't one"""
+        previous = {}
+        for vertex, _, prev in self.dijkstra(source, weight):
+            previous[vertex] = prev
+            if vertex == target:
+                path = [target]
+                while previous[path[-1]] != None:
+                    path.append(previous[path[-1]])
+                return path[::-1]
+        return None
+
+    def all_pairs_distances(self) -> Iterator[tuple[Vertex, dict[Vertex, int]]]:
+        """Yields (source, {vertex: distance in edges}) for every vertex with one BFS each, O(V (V + E))"""
+        for source in self._all_vertices():
+            yield source, dict(self.bfs(source))
+
+    def _all_vertices(self) -> list[Vertex]:
+        """`vertices` plus any edge endpoints that were never added as vertices"""
+        res = dict.fromkeys(self.vertices)
+        res.update(dict.fromkeys(self._out))
+        res.update(dict.fromkeys(self._in))
+        return list(res)
+
+    def compact(self) -> CompactGraph:
+        return CompactGraph.from_graph(self)
 
     def clear(self) -> None:
+        self._vertex_order = None
         self.vertices = set()
-        self.edges = defaultdict(lambda: 0)
+        self.edges = defaultdict(int)
+        self._out = {}
+        self._in = {}
     
-    def adjacency_matrix_list(self, vertex_order: Union[list[Vertex], dict[Vertex, int], None] = None) -> list[list[int]]:
-        """Returns a row-major adjacency matrix for the graph as nested lists"""
-        if not isinstance(vertex_order, dict):
-            if vertex_order == None:
-                vertex_order = sorted(self.vertices, key=lambda v: v.name)
-            vertex_order = {v:i for i,v in enumerate(vertex_order)}
-
-        adj_mat = []
-        for _ in range(len(self.vertices)): adj_mat.append([0]*len(self.vertices))
+    def vertex_order(self) -> dict[Vertex, int]:
+        """Vertex -> row/column of the adjacency exports: the vertices sorted by name
 
+        Cached until vertices are added or removed. Call `invalidate_vertex_order`
+        after renaming vertices or changing `vertices` directly
+        """
+        if self._vertex_order == None or len(self._vertex_order) != len(self.vertices):
+            order = sorted(self.vertices, key=lambda v: v.name)
+            self._vertex_order = {v:i for i,v in enumerate(order)}
+            self._coo = None
+        return self._vertex_order
+
+    def invalidate_vertex_order(self) -> None:
+        self._vertex_order = None
+        self._coo = None
+
+    def _resolve_order(self, vertex_order: Union[list[Vertex], dict[Vertex, int], None]) -> dict[Vertex, int]:
+        if vertex_order == None: return self.vertex_order()
+        if isinstance(vertex_order, dict): return vertex_order
+        return {v:i for i,v in enumerate(vertex_order)}
+
+    def adjacency_coo(self, vertex_order: Union[list[Vertex], dict[Vertex, int], None] = None) -> tuple[array, array, array]:
+        """The adjacency matrix as (rows, columns, multiplicities) triplets, in one pass over the edges
+
+        Undirected edges (other than loops) give an entry in both directions.
+        Each entry is a separate edge, so sum repeated (row, column) pairs.
+        With the default order the triplets are cached until the graph changes
+        """
+        return tuple(array('i', a) for a in self._adjacency_coo(vertex_order))
+
+    def _adjacency_coo(self, vertex_order: Union[list[Vertex], dict[Vertex, int], None] = None) -> tuple[array, array, array]:
+        """`adjacency_coo` without copying the cached arrays"""
+        if vertex_order == None and self._coo != None and self._vertex_order != None \
+                and len(self._vertex_order) == len(self.vertices):
+            return self._coo
+        order = self._resolve_order(vertex_order)
+        # Looking up keys skips the Python-level `Vertex.__hash__`
+        order = {v.key: i for v, i in order.items()}
+        rows, cols, values = array('i'), array('i'), array('i')
         for edge, multiplicity in self.edges.items():
-            if self.directed or edge.is_loop():
-                adj_mat[vertex_order[edge.v1]][vertex_order[edge.v2]] += multiplicity
-            else:
-                adj_mat[vertex_order[edge.v1]][vertex_order[edge.v2]] += multiplicity
-                adj_mat[vertex_order[edge.v2]][vertex_order[edge.v1]] += multiplicity
-                
+            if multiplicity <= 0: continue
+            i, j = order[edge._v1.key], order[edge._v2.key]
+            rows.append(i); cols.append(j); values.append(multiplicity)
+            if not (self.directed or i == j):
+                rows.append(j); cols.append(i); values.append(multiplicity)
+        if vertex_order == None: self._coo = (rows, cols, values)
+        return rows, cols, values
+
+    def adjacency_matrix_list(self, vertex_order: Union[list[Vertex], dict[Vertex, int], None] = None) -> list[list[int]]:
+        """Returns a row-major adjacency matrix for the graph as nested lists"""
+        n = len(self.vertices)
+        adj_mat = [[0]*n for _ in range(n)]
+        for i, j, multiplicity in zip(*self._adjacency_coo(vertex_order)):
+            adj_mat[i][j] += multiplicity
         return adj_mat
+
+    def adjacency_array(self, vertex_order: Union[list[Vertex], dict[Vertex, int], None] = None) -> Optional[np.ndarray]:
+        """The adjacency matrix as an n x n int64 ndarray, or `None` without NumPy"""
+        if not np_available: return None
+        n = len(self.vertices)
+        rows, cols, values = self._adjacency_coo(vertex_order)
+        res = np.zeros((n, n), dtype=np.int64)
+        np.add.at(res, (np.frombuffer(rows, dtype=np.int32), np.frombuffer(cols, dtype=np.int32)),
+                  np.frombuffer(values, dtype=np.int32))
+        return res
+
+    def adjacency_sparse(self, vertex_order: Union[list[Vertex], dict[Vertex, int], None] = None) -> Optional[la.SparseMatrix]:
+        """The adjacency matrix as a CSR `linear_alg.SparseMatrix`, or `None` if linear_alg is unavailable"""
+        if not la_available: return None
+        n = len(self.vertices)
+        rows, cols, values = self._adjacency_coo(vertex_order)
+        return la.SparseMatrix.from_coo((n, n), rows, cols, values.tolist())
     
     def adjacency_matrix(self) -> Optional[la.Matrix]:
         """Returns the adjacency matrix
@@ -211,6 +544,141 @@ class Graph:
         return None
 
 
+
+class CompactGraph:
+    """
+    Integer-indexed copy of a `Graph` for big graphs
+
+    Vertex `i` is `vertices[i]`, and edge `k` goes from `sources[k]` to
+    `targets[k]` with `multiplicities[k]` copies (`directed[k]` says if it's
+    directed). The edges are parallel `array`s, so an edge costs 13 bytes
+    instead of an `Edge` object, its tuple hash and a dict entry.
+    `csr` gives the compressed sparse row adjacency (built once, then cached)
+    for fast neighbor lookups. Converting to and from a `Graph` is one pass over
+    the edges.
+    """
+
+    vertices: list[Vertex]
+    index: dict[Vertex, int]
+    sources: array
+    targets: array
+    multiplicities: array
+    directed: array
+    simple: bool
+    graph_directed: bool
+
+    def __init__(self, vertices: list[Vertex], simple: bool = False, graph_directed: bool = False) -> None:
+        self.vertices = list(vertices)
+        self.index = {v: i for i, v in enumerate(self.vertices)}
+        self.sources = array('i')
+        self.targets = array('i')
+        self.multiplicities = array('i')
+        self.directed = array('b')
+        self.simple = simple
+        self.graph_directed = graph_directed
+        self._csr = None
+
+    @staticmethod
+    def from_graph(graph: Graph) -> CompactGraph:
+        res = CompactGraph(graph._all_vertices(), graph.simple, graph.directed)
+        index = res.index
+        for edge, multiplicity in graph.edges.items():
+            if multiplicity <= 0: continue
+            res.sources.append(index[edge.v1])
+            res.targets.append(index[edge.v2])
+            res.multiplicities.append(multiplicity)
+            res.directed.append(edge.directed)
+        return res
+
+    def to_graph(self) -> Graph:
+        vertices = self.vertices
+        edges = {}
+        # The same edge can be appended more than once, so add up the multiplicities
+        for u, v, m, d in zip(self.sources, self.targets, self.multiplicities, self.directed):
+            e = Edge(vertices[u], vertices[v], bool(d))
+            edges[e] = edges.get(e, 0) + m
+        return Graph(set(vertices), edges, self.simple, self.graph_directed)
+
+    def add_edge(self, u: int, v: int, multiplicity: int = 1, directed: Optional[bool] = None) -> None:
+        """Appends an edge between the vertex ids `u` and `v` (use `add_vertex` for new ids)"""
+        self.sources.append(u)
+        self.targets.append(v)
+        self.multiplicities.append(multiplicity)
+        self.directed.append(self.graph_directed if directed == None else directed)
+        self._csr = None
+
+    def add_vertex(self, vertex: Vertex) -> int:
+        """Returns the id of `vertex`, adding it if needed"""
+        if vertex not in self.index:
+            self.index[vertex] = len(self.vertices)
+            self.vertices.append(vertex)
+            self._csr = None
+        return self.index[vertex]
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.sources)
+
+    def nbytes(self) -> int:
+        """Bytes used by the edge arrays"""
+        return sum(a.itemsize * len(a) for a in (self.sources, self.targets, self.multiplicities, self.directed))
+
+    def csr(self) -> tuple[array, array, array]:
+        """Out-adjacency as (indptr, neighbors, multiplicities)
+
+        The neighbors of vertex `i` are `neighbors[indptr[i]:indptr[i+1]]`. Undirected
+        edges are listed from both ends (loops once), like `Graph.adjacency_matrix_list`
+        """
+        if self._csr != None: return self._csr
+        n = len(self.vertices)
+        counts = [0]*(n+1)
+        for u, v, d in zip(self.sources, self.targets, self.directed):
+            counts[u+1] += 1
+            if not d and u != v: counts[v+1] += 1
+        for i in range(n): counts[i+1] += counts[i]
+        indptr = array('i', counts)
+
+        # Counting sort of the edge ends by source vertex
+        nxt = counts[:-1]
+        neighbors = array('i', bytes(4 * counts[n]))
+        multiplicities = array('i', bytes(4 * counts[n]))
+        for u, v, m, d in zip(self.sources, self.targets, self.multiplicities, self.directed):
+            neighbors[nxt[u]] = v
+            multiplicities[nxt[u]] = m
+            nxt[u] += 1
+            if not d and u != v:
+                neighbors[nxt[v]] = u
+                multiplicities[nxt[v]] = m
+                nxt[v] += 1
+        self._csr = (indptr, neighbors, multiplicities)
+        return self._csr
+
+    def neighbors(self, i: int) -> array:
+        """Ids of the vertices vertex `i` has edges to
+
+        A neighbor joined by more than one `Edge` (say a directed and an undirected
+        one) appears once per edge
+        """
+        indptr, neighbors, _ = self.csr()
+        return neighbors[indptr[i]:indptr[i+1]]
+
+    def degree(self, i: int) -> int:
+        """Number of edges leaving vertex `i`, counting multiplicity"""
+        indptr, _, multiplicities = self.csr()
+        return sum(multiplicities[indptr[i]:indptr[i+1]])
+
+    def adjacency_sparse(self) -> Optional[la.SparseMatrix]:
+        """The adjacency matrix as a `linear_alg.SparseMatrix` (`None` if linear_alg is unavailable)"""
+        if not la_available: return None
+        indptr, neighbors, multiplicities = self.csr()
+        n = len(self.vertices)
+        rows = [i for i in range(n) for _ in range(indptr[i+1] - indptr[i])]
+        return la.SparseMatrix.from_coo((n, n), rows, neighbors.tolist(), multiplicities.tolist())
+
+
 if __name__ == "__main__":
     a = Vertex("A")
     b = Vertex("B")
@@ -307,7 +307,7 @@ class GraphMaker:
                         # Creating a vertex
                         if self.selected == None:
                             new_vert = Vertex(self.vertex_namer(self.graph))
-                            self.graph.vertices.add(new_vert)
+                            self.graph.add_vertex(new_vert)
                             self.vert_pos[new_vert] = mouse_coords
 
                             self.selected = new_vert
@@ -0,0 +1,183 @@
+"""
+Benchmarks for linear_alg
+
+Times the main operations for every backend at a few sizes and prints the
+results as JSON so runs from different commits can be compared:
+
+    python benchmark.py --sizes 10 50 100 --output bench.json
+
+Every benchmark uses random matrices from a fixed seed so runs are reproducible.
+Besides the backends, the algorithms are timed separately too ("determinant_lu",
+"qr_mgs", "mul_strassen"...) so a regression in one kernel isn't hidden by
+"auto" picking another one. Slow algorithms are skipped past `MAX_SIZE`.
+"""
+from __future__ import annotations
+from typing import Callable, Optional
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import linear_alg as la
+
+
+def random_rows(n: int, m: int, backend: str, rng: random.Random) -> list[list[float]]:
+    # Small ints for the "exact" backend so the fractions don't blow up
+    if backend == "exact":
+        return [[rng.randint(-9, 9) for _ in range(m)] for _ in range(n)]
+    return [[rng.randint(-9, 9) + rng.random() for _ in range(m)] for _ in range(n)]
+
+def random_matrix(n: int, backend: str, rng: random.Random) -> la.Matrix:
+    return la.Matrix(random_rows(n, n, backend, rng), backend)
+
+
+def bench_mul(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+    a = random_matrix(n, backend, rng)
+    b = random_matrix(n, backend, rng)
+    return lambda: a * b
+
+def bench_rref(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+    a = random_matrix(n, backend, rng)
+    return lambda: a.copy().to_reduced_echelon_form()
+
+def bench_determinant(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+    a = random_matrix(n, backend, rng)
+    return lambda: a.determinant()
+
+def bench_determinant_method(method: str) -> Callable[[int, str, random.Random], Callable[[], object]]:
+    def bench(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+        a = random_matrix(n, backend, rng)
+        return lambda: a.determinant(method=method)
+    return bench
+
+def bench_qr(method: str) -> Callable[[int, str, random.Random], Callable[[], object]]:
+    def bench(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+        a = random_matrix(n, backend, rng)
+        return lambda: a.qr(method)
+    return bench
+
+def bench_mul_with(strassen: bool) -> Callable[[int, str, random.Random], Optional[Callable[[], object]]]:
+    """`mul` with Strassen forced on (at least one level) or off by changing `STRASSEN_THRESHOLD`"""
+    def bench(n: int, backend: str, rng: random.Random) -> Optional[Callable[[], object]]:
+        if backend == "numpy": return None # NumPy's matmul never uses either
+        threshold = min(n, 32) if strassen else n + 1
+        f = bench_mul(n, backend, rng)
+        def run():
+            old = la.STRASSEN_THRESHOLD
+            la.STRASSEN_THRESHOLD = threshold
+            try:
+                return f()
+            finally:
+                la.STRASSEN_THRESHOLD = old
+        return run
+    return bench
+
+def bench_inverse(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+    a = random_matrix(n, backend, rng)
+    return lambda: a.inverse()
+
+def bench_transpose(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+    a = random_matrix(n, backend, rng)
+    return lambda: a.transpose()
+
+def bench_dot(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+    # n*n entries so the work grows like the matrix benchmarks' inputs
+    u = la.Vector(random_rows(1, n*n, backend, rng)[0], backend)
+    v = la.Vector(random_rows(1, n*n, backend, rng)[0], backend)
+    return lambda: u.dot(v)
+
+def bench_orthogonalize(n: int, backend: str, rng: random.Random) -> Callable[[], object]:
+    basis = [la.Vector(row, backend) for row in random_rows(n, n, backend, rng)]
+    return lambda: la.orthogonalize(basis)
+
+# A benchmark returns `None` if it doesn't apply to a backend
+BENCHMARKS: dict[str, Callable[[int, str, random.Random], Optional[Callable[[], object]]]] = {
+    "mul": bench_mul,
+    "mul_blocked": bench_mul_with(strassen=False),
+    "mul_strassen": bench_mul_with(strassen=True),
+    "rref": bench_rref,
+    "determinant": bench_determinant,
+    "determinant_lu": bench_determinant_method("lu"),
+    "determinant_bareiss": bench_determinant_method("bareiss"),
+    "determinant_berkowitz": bench_determinant_method("berkowitz"),
+    "determinant_cofactor": bench_determinant_method("cofactor"),
+    "qr_householder": bench_qr("householder"),
+    "qr_mgs": bench_qr("mgs"),
+    "inverse": bench_inverse,
+    "transpose": bench_transpose,
+    "dot": bench_dot,
+    "orthogonalize": bench_orthogonalize,
+}
+
+# Largest size to run the slow (O(n^4) and O(n!)) algorithms at
+MAX_SIZE: dict[str, int] = {
+    "determinant_berkowitz": 50,
+    "determinant_cofactor": 7,
+}
+
+
+def time_it(f: Callable[[], object], repeat: int) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return times
+
+def git_commit() -> Optional[str]:
+    try:
+        res = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return res.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(benchmarks: list[str], backends: list[str], sizes: list[int], repeat: int, seed: int) -> dict:
+    results = []
+    for name in benchmarks:
+        for backend in backends:
+            for n in sizes:
+                if n > MAX_SIZE.get(name, n): continue
+                f = BENCHMARKS[name](n, backend, random.Random(seed))
+                if f is None: continue
+                times = time_it(f, repeat)
+                results.append({
+                    "benchmark": name,
+                    "backend": backend,
+                    "size": n,
+                    "repeat": repeat,
+                    "best": min(times),
+                    "median": statistics.median(times),
+                })
+                print(f"{name:>22} {backend:>6} n={n:<5} best={min(times):.6f}s", file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": la.np.__version__ if la.np_available else None,
+        "seed": seed,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    available_backends = [b for b in la.BACKENDS if b != "numpy" or la.np_available]
+
+    parser = argparse.ArgumentParser(description="Benchmark linear_alg and print the results as JSON")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--backends", nargs="+", choices=available_backends, default=available_backends)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 50, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to write the JSON to instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args.benchmarks, args.backends, args.sizes, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -1,17 +1,154 @@
 from __future__ import annotations
-from typing import Any, Optional, Union, TypeVar, Generic
+from typing import Any, Callable, Optional, Union, TypeVar, Generic
+from abc import ABC, abstractmethod
+from array import array
+from fractions import Fraction
+import cmath
+import concurrent.futures
 import copy
+import functools
+import heapq
+import math
+import mmap
+import operator
+import os
+import random
+import re
+import struct
+
+# NumPy is optional. Without it every Matrix uses the plain list backend
+np_available: bool
+try:
+    import numpy as np
+    np_available = True
+except ImportError:
+    np_available = False
 
 EPSILON = 0.0001
+# Relative float precision, for iterative methods (eigenvalues) that need more than `EPSILON`
+MACHINE_EPSILON = 2.0**-52
+
+# Storage used by `Matrix` when no `backend` is given. "numpy" stores numeric
+# matrices as a contiguous ndarray and falls back to "list" for anything else
+# (`Term`, `Equation`, `Fraction`...) or when NumPy isn't installed. "exact"
+# stores every entry as a `Fraction` so nothing is ever rounded
+BACKENDS = ("list", "numpy", "exact")
+default_backend = "list"
+
+# List backend matrix multiplication: columns of the right matrix are processed
+# `MATMUL_BLOCK_SIZE` at a time, and square numeric matrices at least
+# `STRASSEN_THRESHOLD` wide are split recursively with Strassen-Winograd
+MATMUL_BLOCK_SIZE = 64
+STRASSEN_THRESHOLD = 128
+
+# Opt-in parallelism for the list backend, see `set_parallel`. With more than one
+# worker, multiplications whose left matrix has at least `PARALLEL_THRESHOLD`
+# rows are split into row blocks, and LU factorizations (used by `solve`,
+# `inverse` and the "lu" determinant) of at least that size update the trailing
+# submatrix in row blocks. Everything smaller stays serial
+PARALLEL_WORKERS = 0
+PARALLEL_THRESHOLD = 256
 
 T = TypeVar('T')
 
+_INT64_MIN = -2**63
+_INT64_MAX = 2**63 - 1
+
+def _is_array(x: Any) -> bool:
+    return np_available and isinstance(x, np.ndarray)
+
+def _to_array(rows: Any) -> Optional[np.ndarray]:
+    """Converts `rows` (a list of rows) into a 2D ndarray
+
+    Only plain ints and floats are converted since anything else (`Term`,
+    `Fraction`, ints too big for int64...) would be lost or silently changed by
+    NumPy. Returns `None` if `rows` can't be stored as an ndarray.
+    """
+    if not np_available: return None
+    if _is_array(rows): return rows if rows.ndim == 2 else None
+
+    is_float = False
+    for row in rows:
+        for n in row:
+            if isinstance(n, (float, np.floating)):
+                is_float = True
+            elif isinstance(n, (int, np.integer)) and not isinstance(n, bool):
+                if not _INT64_MIN <= n <= _INT64_MAX: return None
+            else:
+                return None
+    return np.array([list(row) for row in rows], dtype=np.float64 if is_float else np.int64)
+
+def _to_fraction(x: Any) -> Optional[Fraction]:
+    """Returns `x` as a `Fraction` or `None` if it isn't a plain number
+
+    Floats go through their shortest repr so 0.1 becomes 1/10 instead of the
+    exact binary value 3602879701896397/36028797018963968
+    """
+    if isinstance(x, Fraction): return x
+    if isinstance(x, bool): return None
+    if isinstance(x, int) or (np_available and isinstance(x, np.integer)): return Fraction(int(x))
+    if isinstance(x, float) or (np_available and isinstance(x, np.floating)): return Fraction(repr(float(x)))
+    return None
+
+def _to_fractions(rows: Any) -> Optional[list[list[Fraction]]]:
+    res = []
+    for row in rows:
+        new_row = [_to_fraction(x) for x in row]
+        if None in new_row: return None
+        res.append(new_row)
+    return res
+
+def _round_near_int(a: np.ndarray) -> np.ndarray:
+    """The ndarray version of `Vector.__mul__`'s conditional rounding"""
+    if a.dtype.kind != 'f': return a
+    rounded = np.round(a)
+    return np.where(np.abs(rounded - a) < EPSILON, rounded, a)
+
+def _is_scalar(x: Any) -> bool:
+    return isinstance(x, (int, float)) or (np_available and isinstance(x, np.number))
+
+def _max_abs_int(x: Any) -> int:
+    """The largest |entry| of an int ndarray (or |x| for an int scalar) as a Python int
+
+    0 for floats since they don't wrap around. NumPy silently wraps int64 results
+    that overflow, so this is used to check results fit before computing them
+    """
+    if _is_array(x):
+        if x.dtype.kind not in "iu" or x.size == 0: return 0
+        return max(-int(x.min()), int(x.max()))
+    if isinstance(x, bool): return 0
+    if isinstance(x, int) or (np_available and isinstance(x, np.integer)): return abs(int(x))
+    return 0
+
+def _as_python(x: Any) -> Any:
+    """`x` (an ndarray or a scalar) with NumPy numbers turned into Python ones, for
+    arithmetic that has to go past int64 (NumPy ints wrap around or raise)"""
+    if _is_array(x): return x.tolist()
+    if np_available and isinstance(x, np.generic): return x.item()
+    return x
+
+
 class Vector(Generic[T]):
+    """
+    `data` is usually a list but may also be a 1D ndarray (see `Matrix`'s "numpy"
+    backend). Operations between ndarray-backed vectors and scalars stay in NumPy.
+    For plain floats, `FloatVector` is more compact and has fused in-place kernels
+    """
+    __slots__ = ("data",)
     data: list[T]
 
-    def __init__(self, data: list[T]) -> None:
+    def __init__(self, data: list[T], backend: Optional[str] = None) -> None:
+        if backend == "numpy" and not _is_array(data):
+            array = _to_array([data])
+            if array is not None: data = array[0]
+        elif backend == "exact":
+            fractions = _to_fractions([data])
+            if fractions is not None: data = fractions[0]
         self.data = data
 
+    def _is_exact(self) -> bool:
+        return len(self.data) > 0 and isinstance(self.data[0], Fraction)
+
     def __len__(self) -> int:
         return len(self.data)
 
@@ -31,32 +168,53 @@ class Vector(Generic[T]):
         return f"Vector({str(self)})"
 
     def __mul__(self, scalar: T) -> Vector[T]:
+        if _is_array(self.data) and _is_scalar(scalar) \
+                and _max_abs_int(self.data) * _max_abs_int(scalar) <= _INT64_MAX:
+            return Vector(_round_near_int(self.data * scalar))
+        # Products of `Fraction`s are exact so there is nothing to round
+        if isinstance(scalar, Fraction) or self._is_exact():
+            return Vector([n*scalar for n in self.data])
+
         conditional_rounding = lambda x: round(x) if abs(round(x)-x) < EPSILON else x
         
-        return Vector([conditional_rounding(n*scalar) for n in self])
+        scalar = _as_python(scalar)
+        return Vector([conditional_rounding(n*scalar) for n in _as_python(self.data)])
     
     def __rmul__(self, scalar: T) -> Vector[T]:
         return self*scalar
     
     def __truediv__(self, scalar: T) -> Vector[T]:
+        if isinstance(scalar, int) and self._is_exact():
+            return self * Fraction(1, scalar)
         return self * (1 / scalar)
     
     def __rtruediv__(self, scalar) -> Vector[T]:
+        if _is_array(self.data) and _is_scalar(scalar):
+            return Vector(scalar / self.data)
         return Vector([scalar/v for v in self])
 
     def __add__(self, other: Vector[T]) -> Vector[T]:
         if len(self) != len(other):
             raise ValueError("Cannot add two vectors of different lengths")
 
-        return Vector([self[i] + other[i] for i in range(len(self))])
+        if _is_array(self.data) and _is_array(other.data) \
+                and _max_abs_int(self.data) + _max_abs_int(other.data) <= _INT64_MAX:
+            return Vector(self.data + other.data)
+        return Vector(list(map(operator.add, _as_python(self.data), _as_python(other.data))))
     
     def __sub__(self, other: Vector[T]) -> Vector[T]:
-        return self + (other * -1)
+        if len(self) != len(other):
+            raise ValueError("Cannot add two vectors of different lengths")
+        if _is_array(self.data) and _is_array(other.data) \
+                and _max_abs_int(self.data) + _max_abs_int(other.data) <= _INT64_MAX:
+            return Vector(self.data - other.data)
+        return Vector(list(map(operator.sub, _as_python(self.data), _as_python(other.data))))
 
     def __neg__(self) -> Vector[T]:
         return self * -1
 
     def __abs__(self) -> Vector[T]:
+        if _is_array(self.data): return Vector(np.abs(self.data))
         return Vector([abs(n) for n in self.data])
 
     def __eq__(self, other: Any) -> bool:
@@ -69,27 +227,37 @@ class Vector(Generic[T]):
         return not self == other
 
     def dot(self, other: Vector[T]) -> T:
+        if _is_array(self.data) and _is_array(other.data) \
+                and _max_abs_int(self.data) * _max_abs_int(other.data) * len(self.data) <= _INT64_MAX:
+            return np.dot(self.data, other.data)
+        a, b = _as_python(self.data), _as_python(other.data)
         res = 0
-        for i in range(len(self.data)):
-            res += self.data[i]*other.data[i]
+        for i in range(len(a)):
+            res += a[i]*b[i]
         return res
 
     def magnitude(self) -> T:
+        if _is_array(self.data): return float(np.sqrt(np.dot(self.data, self.data)))
         return sum(n**2 for n in self.data)**(1/2)
 
     def normalize(self) -> Vector[T]:
         return self / self.magnitude()
 
     def round(self, dec: int = 0) -> None:
-        self.data = [round(d, dec) for d in self.data]
+        if _is_array(self.data): self.data = np.round(self.data, dec)
+        else: self.data = [round(d, dec) for d in self.data]
 
     def is_zero(self) -> bool:
+        if _is_array(self.data): return not self.data.any()
         for n in self.data:
             if n != 0:
                 return False
         return True
     
     def index_first_nonzero(self) -> Optional[int]:
+        if _is_array(self.data):
+            nonzero = np.flatnonzero(np.abs(self.data) > EPSILON)
+            return int(nonzero[0]) if len(nonzero) > 0 else None
         for i in range(len(self.data)):
             if abs(self.data[i]) > EPSILON:
                 return i
@@ -103,7 +271,8 @@ class Vector(Generic[T]):
             return self.data[i]
     
     def append(self, n: T) -> None:
-        self.data.append(n)
+        if _is_array(self.data): self.data = np.append(self.data, n)
+        else: self.data.append(n)
 
     def ortho_proj(self, other: Vector[T]):
         return (self.dot(other) / other.dot(other)) * other
@@ -112,15 +281,533 @@ class Vector(Generic[T]):
         return Vector(self.data.copy())
 
 
+# Below this length the fixed cost of a NumPy call is more than the loop it saves
+FLOAT_VECTOR_NUMPY_MIN = 64
+
+def _float_view(data: Union[array, memoryview]) -> Optional[np.ndarray]:
+    """A float64 ndarray sharing `data`'s buffer, or `None` if it's not worth it or NumPy is missing"""
+    if not np_available or len(data) < FLOAT_VECTOR_NUMPY_MIN: return None
+    return np.frombuffer(data, dtype=np.float64)
+
+def _from_view(view: np.ndarray) -> FloatVector:
+    res = array("d")
+    res.frombytes(view.tobytes())
+    return FloatVector(res)
+
+class FloatVector(Vector[float]):
+    """
+    Compact vector of floats stored in an `array('d')` (8 bytes per entry instead
+    of a list of float objects)
+
+    A `memoryview` of doubles (like a row of a file-backed matrix) is used as is
+    without copying. Besides the usual `Vector` operations it has fused kernels
+    for row operations, which make a single pass without building intermediate
+    vectors: `axpy` (self += a x), `scale_inplace`, `sub`, `dot` and `norm`. Long
+    vectors run them in NumPy on the same buffer when it's available.
+    Unlike `Vector`, results aren't rounded to nearby ints.
+    """
+    __slots__ = ()
+    data: Union[array, memoryview]
+
+    def __init__(self, data: Any) -> None:
+        if isinstance(data, memoryview) and data.format == "d" and data.ndim == 1:
+            self.data = data
+        elif isinstance(data, array) and data.typecode == "d":
+            self.data = data
+        else:
+            self.data = array("d", data)
+
+    @staticmethod
+    def zeros(n: int) -> FloatVector:
+        return FloatVector(array("d", bytes(8*n)))
+
+    def __repr__(self) -> str:
+        return f"FloatVector({str(self)})"
+
+    def axpy(self, a: float, x: Vector[float]) -> FloatVector:
+        """self += `a` * `x` in place. Returns self"""
+        if len(self) != len(x):
+            raise ValueError("Cannot add two vectors of different lengths")
+        view = _float_view(self.data)
+        if view is not None:
+            view += a * (_float_view(x.data) if isinstance(x, FloatVector) else np.asarray(x.data, dtype=np.float64))
+        else:
+            self.data[:] = array("d", map(operator.add, self.data, map(float(a).__mul__, x.data)))
+        return self
+
+    def scale_inplace(self, a: float) -> FloatVector:
+        """self *= `a` in place. Returns self"""
+        view = _float_view(self.data)
+        if view is not None:
+            view *= a
+        else:
+            self.data[:] = array("d", map(float(a).__mul__, self.data))
+        return self
+
+    def sub(self, other: Vector[float]) -> FloatVector:
+        """self - `other` as a new vector, in one pass"""
+        if len(self) != len(other):
+            raise ValueError("Cannot add two vectors of different lengths")
+        view = _float_view(self.data)
+        if view is not None and isinstance(other, FloatVector):
+            return _from_view(view - _float_view(other.data))
+        return FloatVector(array("d", list(map(operator.sub, self.data, other.data))))
+
+    def dot(self, other: Vector[float]) -> float:
+        view = _float_view(self.data)
+        if view is not None and isinstance(other, FloatVector):
+            return float(view @ _float_view(other.data))
+        return sum(map(operator.mul, self.data, other.data))
+
+    def norm(self) -> float:
+        view = _float_view(self.data)
+        if view is not None: return float(np.sqrt(view @ view))
+        return math.sqrt(sum(map(operator.mul, self.data, self.data)))
+
+    magnitude = norm
+
+    def __add__(self, other: Vector[float]) -> FloatVector:
+        if len(self) != len(other):
+            raise ValueError("Cannot add two vectors of different lengths")
+        view = _float_view(self.data)
+        if view is not None and isinstance(other, FloatVector):
+            return _from_view(view + _float_view(other.data))
+        return FloatVector(array("d", list(map(operator.add, self.data, other.data))))
+
+    __sub__ = sub
+
+    def __mul__(self, scalar: float) -> FloatVector:
+        view = _float_view(self.data)
+        if view is not None: return _from_view(view * scalar)
+        return FloatVector(array("d", list(map(float(scalar).__mul__, self.data))))
+
+    def __rmul__(self, scalar: float) -> FloatVector:
+        return self * scalar
+
+    def __truediv__(self, scalar: float) -> FloatVector:
+        return self * (1 / scalar)
+
+    def __neg__(self) -> FloatVector:
+        return self * -1
+
+    def __abs__(self) -> FloatVector:
+        return FloatVector(array("d", map(abs, self.data)))
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Vector) or len(self) != len(other): return False
+        return all(map(operator.eq, self.data, other.data))
+
+    def normalize(self) -> FloatVector:
+        return self / self.norm()
+
+    def round(self, dec: int = 0) -> None:
+        self.data[:] = array("d", (round(x, dec) for x in self.data))
+
+    def append(self, n: float) -> None:
+        if isinstance(self.data, memoryview): self.data = array("d", self.data)
+        self.data.append(n)
+
+    def copy(self) -> FloatVector:
+        return FloatVector(array("d", self.data))
+
+
+def _np_row_reduce(a: np.ndarray, reduced: bool) -> tuple[np.ndarray, list[int]]:
+    """Row reduces a copy of `a` with partial pivoting. Leading entries are scaled to 1
+
+    Returns the reduced copy and the pivot columns
+    """
+    a = a.astype(np.float64)
+    n, m = a.shape
+    pivots = []
+    r = 0
+    for c in range(m):
+        if r == n: break
+        p = r + int(np.argmax(np.abs(a[r:, c])))
+        if abs(a[p, c]) <= EPSILON:
+            a[r:, c] = 0
+            continue
+        if p != r: a[[r, p]] = a[[p, r]]
+
+        a[r, c:] /= a[r, c]
+        a[r+1:, c:] -= np.outer(a[r+1:, c], a[r, c:])
+        if reduced:
+            a[:r, c:] -= np.outer(a[:r, c], a[r, c:])
+        pivots.append(c)
+        r += 1
+    return _round_near_int(a), pivots
+
+
+def _numeric_kind(rows: Any) -> str:
+    """Returns the widest kind of number in `rows`
+
+    "int", "rational" (ints and `Fraction`s), "float" or "other" (anything
+    symbolic like `Term`s or `Equation`s)
+    """
+    kind = "int"
+    for row in rows:
+        for n in row:
+            if isinstance(n, bool): return "other"
+            elif isinstance(n, int) or (np_available and isinstance(n, np.integer)): continue
+            elif isinstance(n, Fraction):
+                if kind == "int": kind = "rational"
+            elif isinstance(n, float) or (np_available and isinstance(n, np.floating)):
+                kind = "float"
+            else:
+                return "other"
+    return kind
+
+def _round_near_int_rows(a: list[list[T]]) -> None:
+    """The list version of `Vector.__mul__`'s conditional rounding, done in place"""
+    for row in a:
+        for j in range(len(row)):
+            x = row[j]
+            if isinstance(x, float):
+                r = round(x)
+                if abs(r - x) < EPSILON: row[j] = r
+
+def _integer_row(row: list[Union[int, Fraction]]) -> tuple[list[int], int]:
+    """Scales a row of ints and `Fraction`s to the smallest row of ints it's proportional to
+
+    Returns the integer row and the (possibly fractional) factor it was scaled by
+    """
+    lcm = math.lcm(*(Fraction(x).denominator for x in row))
+    ints = [int(x*lcm) for x in row]
+    gcd = math.gcd(*ints)
+    if gcd > 1: ints = [x // gcd for x in ints]
+    return ints, Fraction(lcm, gcd if gcd > 0 else 1)
+
+def _row_reduce_exact(a: list[list[Union[int, Fraction]]], reduced: bool) -> list[int]:
+    """`_row_reduce` for ints and `Fraction`s, done in place
+
+    Every row is kept as integers divided by their gcd, so the elimination never
+    touches a `Fraction` (and its gcd on every operation) and the numbers stay
+    small. Pivots are the smallest nonzero candidate, also to keep them small.
+    Rows are only turned back into `Fraction`s with leading 1s at the end.
+    """
+    n = len(a)
+    m = len(a[0]) if n > 0 else 0
+    rows = [_integer_row(row)[0] for row in a]
+
+    pivots = []
+    r = 0
+    for c in range(m):
+        if r == n: break
+        p = None
+        for i in range(r, n):
+            if rows[i][c] != 0 and (p == None or abs(rows[i][c]) < abs(rows[p][c])):
+                p = i
+        if p == None: continue
+        rows[r], rows[p] = rows[p], rows[r]
+
+        row_r = rows[r]
+        pivot = row_r[c]
+        for i in (range(n) if reduced else range(r+1, n)):
+            factor = rows[i][c]
+            if i == r or factor == 0: continue
+            g = math.gcd(pivot, factor)
+            new_row = [(pivot//g)*x - (factor//g)*y for x, y in zip(rows[i], row_r)]
+            g = math.gcd(*new_row)
+            rows[i] = [x // g for x in new_row] if g > 1 else new_row
+
+        pivots.append(c)
+        r += 1
+
+    for i, row in enumerate(rows):
+        lead = row[pivots[i]] if i < len(pivots) else 1
+        a[i] = [Fraction(x, lead) for x in row]
+    return pivots
+
+def _row_reduce(a: list[list[T]], reduced: bool) -> list[int]:
+    """Gaussian elimination with partial pivoting on the list of rows `a`, done in place
+
+    Rows are swapped by index and updated with one fused pass per row. Leading
+    entries are scaled to 1. If `reduced` is `True` the entries above each pivot
+    are eliminated as well (reduced row echelon form).
+    Ints and floats are compared against `EPSILON`, since ints turn into floats
+    at the first division and leave rounding noise behind. Anything with
+    `Fraction`s goes through the exact `_row_reduce_exact` instead.
+
+    Returns the pivot columns; the rank is their count
+    """
+    n = len(a)
+    m = len(a[0]) if n > 0 else 0
+    kind = _numeric_kind(a)
+    if kind == "rational": return _row_reduce_exact(a, reduced)
+    tolerance = 0 if kind == "other" else EPSILON
+
+    pivots = []
+    r = 0
+    for c in range(m):
+        if r == n: break
+        p = max(range(r, n), key=lambda i: abs(a[i][c]))
+        if abs(a[p][c]) <= tolerance:
+            for i in range(r, n): a[i][c] = 0
+            continue
+        a[r], a[p] = a[p], a[r]
+
+        row_r = a[r]
+        pivot = row_r[c]
+        row_r[c:] = [x / pivot for x in row_r[c:]]
+        row_r[c] = 1
+        tail = row_r[c+1:]
+
+        for i in (range(n) if reduced else range(r+1, n)):
+            row_i = a[i]
+            factor = row_i[c]
+            if i == r or factor == 0: continue
+            row_i[c+1:] = [x - factor*y for x, y in zip(row_i[c+1:], tail)]
+            row_i[c] = 0
+
+        pivots.append(c)
+        r += 1
+
+    _round_near_int_rows(a)
+    return pivots
+
+def _matmul_blocked(a: list[list[T]], b: list[list[T]], symbolic: bool = False) -> list[list[T]]:
+    """Row-major `a` * `b`, taking `MATMUL_BLOCK_SIZE` columns of `b` at a time so
+    they stay in cache while every row of `a` passes over them
+
+    `symbolic` adds up each entry with `_sum` instead of `sum`
+    """
+    total = _sum if symbolic else sum
+    b_cols = list(zip(*b))
+    res = [[] for _ in a]
+    for j in range(0, len(b_cols), MATMUL_BLOCK_SIZE):
+        block = b_cols[j:j+MATMUL_BLOCK_SIZE]
+        for row, res_row in zip(a, res):
+            res_row.extend([total(map(operator.mul, row, col)) for col in block])
+    return res
+
+def _madd(a: list[list[T]], b: list[list[T]]) -> list[list[T]]:
+    return [list(map(operator.add, r, s)) for r, s in zip(a, b)]
+
+def _msub(a: list[list[T]], b: list[list[T]]) -> list[list[T]]:
+    return [list(map(operator.sub, r, s)) for r, s in zip(a, b)]
+
+def _matmul_strassen(a: list[list[T]], b: list[list[T]]) -> list[list[T]]:
+    """Strassen-Winograd multiplication of two n x n matrices
+
+    7 half-size products and 15 additions per level instead of 8 products. Only
+    ever adds, subtracts and multiplies, so ints and `Fraction`s stay exact
+    """
+    n = len(a)
+    if n < STRASSEN_THRESHOLD:
+        return _matmul_blocked(a, b)
+    if n % 2 == 1:
+        # Pad with a zero row and column
+        a = [row + [0] for row in a] + [[0]*(n+1)]
+        b = [row + [0] for row in b] + [[0]*(n+1)]
+        return [row[:n] for row in _matmul_strassen(a, b)[:n]]
+
+    h = n // 2
+    a11 = [row[:h] for row in a[:h]]; a12 = [row[h:] for row in a[:h]]
+    a21 = [row[:h] for row in a[h:]]; a22 = [row[h:] for row in a[h:]]
+    b11 = [row[:h] for row in b[:h]]; b12 = [row[h:] for row in b[:h]]
+    b21 = [row[:h] for row in b[h:]]; b22 = [row[h:] for row in b[h:]]
+
+    s1 = _madd(a21, a22)
+    s2 = _msub(s1, a11)
+    s3 = _msub(a11, a21)
+    s4 = _msub(a12, s2)
+    t1 = _msub(b12, b11)
+    t2 = _msub(b22, t1)
+    t3 = _msub(b22, b12)
+    t4 = _msub(t2, b21)
+
+    p1 = _matmul_strassen(a11, b11)
+    p2 = _matmul_strassen(a12, b21)
+    p3 = _matmul_strassen(s4, b22)
+    p4 = _matmul_strassen(a22, t4)
+    p5 = _matmul_strassen(s1, t1)
+    p6 = _matmul_strassen(s2, t2)
+    p7 = _matmul_strassen(s3, t3)
+
+    u2 = _madd(p1, p6)
+    u3 = _madd(u2, p7)
+    c11 = _madd(p1, p2)
+    c12 = _madd(_madd(u2, p5), p3)
+    c21 = _msub(u3, p4)
+    c22 = _madd(u3, p5)
+    return [r + s for r, s in zip(c11, c12)] + [r + s for r, s in zip(c21, c22)]
+
+_parallel_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+def set_parallel(workers: Optional[int] = None, threshold: Optional[int] = None) -> None:
+    """
+    Turns on parallel execution with `workers` processes (default: one per core).
+    `workers` of 0 or 1 turns it back off. `threshold` changes `PARALLEL_THRESHOLD`
+
+    The pool is started on the first parallel operation and reused after that.
+    Work is sent to the processes by pickling rows, so it only pays off for
+    matrices well past a couple hundred rows
+    """
+    global PARALLEL_WORKERS, PARALLEL_THRESHOLD, _parallel_pool
+    if workers == None: workers = os.cpu_count() or 1
+    if threshold != None: PARALLEL_THRESHOLD = threshold
+    if workers != PARALLEL_WORKERS and _parallel_pool is not None:
+        _parallel_pool.shutdown()
+        _parallel_pool = None
+    PARALLEL_WORKERS = workers
+
+def _parallel(n: int) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+    """The process pool if an operation on `n` rows should run in parallel, otherwise `None`"""
+    global _parallel_pool
+    if PARALLEL_WORKERS <= 1 or n < PARALLEL_THRESHOLD: return None
+    if _parallel_pool is None:
+        _parallel_pool = concurrent.futures.ProcessPoolExecutor(PARALLEL_WORKERS)
+    return _parallel_pool
+
+def _chunks(rows: list, count: int) -> list[list]:
+    """Splits `rows` into `count` (or fewer) contiguous blocks of about the same size"""
+    size = -(-len(rows) // count)
+    return [rows[i:i+size] for i in range(0, len(rows), size)]
+
+def _matmul_parallel(pool: concurrent.futures.ProcessPoolExecutor, a: list[list[T]], b: list[list[T]],
+                     symbolic: bool) -> list[list[T]]:
+    """`_matmul_blocked` with every worker multiplying one block of rows of `a` by all of `b`"""
+    blocks = _chunks(a, PARALLEL_WORKERS)
+    res = []
+    for block in pool.map(_matmul_blocked, blocks, [b]*len(blocks), [symbolic]*len(blocks)):
+        res.extend(block)
+    return res
+
+def _trailing_update(rows: list[list[T]], factors: list[list[T]], u: list[list[T]]) -> list[list[T]]:
+    """`rows` - `factors` `u`, the trailing submatrix update of blocked LU for one block of rows"""
+    res = []
+    for row, row_factors in zip(rows, factors):
+        for f, u_row in zip(row_factors, u):
+            if f != 0: row = [x - f*y for x, y in zip(row, u_row)]
+        res.append(row)
+    return res
+
+def _matmul(a: list[list[T]], b: list[list[T]]) -> list[list[T]]:
+    """Picks Strassen-Winograd for big square numeric matrices and the blocked kernel otherwise
+
+    Splits the rows of `a` over the process pool instead in parallel mode
+    """
+    n = len(a)
+    symbolic = _numeric_kind(a) == "other" or _numeric_kind(b) == "other"
+    pool = _parallel(n)
+    if pool is not None:
+        return _matmul_parallel(pool, a, b, symbolic)
+    if n >= STRASSEN_THRESHOLD and n == len(a[0]) == len(b) == len(b[0]) and not symbolic:
+        return _matmul_strassen(a, b)
+    return _matmul_blocked(a, b, symbolic)
+
+def _bareiss_determinant(a: list[list[T]], div: Callable[[T, T], T]) -> T:
+    """Fraction-free (Bareiss) elimination on the square matrix `a`, which is overwritten
+
+    Every intermediate value is a minor of `a`, so the divisions (done with `div`)
+    are exact and the entries stay as small as the determinant itself. That makes
+    it work for ints (`operator.floordiv`) and polynomials (`Polynomial.exact_div`)
+    as well as for fields
+    """
+    n = len(a)
+    sign = 1
+    prev = 1
+    for k in range(n-1):
+        if a[k][k] == 0:
+            for p in range(k+1, n):
+                if a[p][k] != 0:
+                    a[k], a[p] = a[p], a[k]
+                    sign = -sign
+                    break
+            else:
+                return 0
+
+        pivot = a[k][k]
+        row_k = a[k]
+        for i in range(k+1, n):
+            row_i = a[i]
+            factor = row_i[k]
+            row_i[k+1:] = [div(x*pivot - factor*y, prev) for x, y in zip(row_i[k+1:], row_k[k+1:])]
+        prev = pivot
+    return sign * a[n-1][n-1]
+
+def _berkowitz(a: list[list[T]]) -> list[T]:
+    """Coefficients of det(tI - a), highest power first, with Berkowitz's algorithm
+
+    Only adds and multiplies (no divisions), so it works for any entries that form
+    a ring, like ints or `Polynomial`s. O(n^4)
+    """
+    n = len(a)
+    coefficients = [1]
+    for k in range(n):
+        # Split the leading (k+1)x(k+1) block into [[m, s], [r, a_kk]]
+        r = a[k][:k]
+        m = [row[:k] for row in a[:k]]
+        v = [a[i][k] for i in range(k)]
+        # First column of the Toeplitz matrix: 1, -a_kk, -r s, -r m s, -r m^2 s...
+        toeplitz = [1, -a[k][k]]
+        for _ in range(k):
+            toeplitz.append(-_sum(map(operator.mul, r, v)))
+            v = [_sum(map(operator.mul, row, v)) for row in m]
+        coefficients = [
+            _sum(toeplitz[i-j] * coefficients[j] for j in range(max(0, i-k-1), min(i, k)+1))
+            for i in range(k+2)
+        ]
+    return coefficients
+
+def _lu_determinant(a: list[list[T]]) -> T:
+    """LU elimination with partial pivoting on the square matrix `a`, which is overwritten"""
+    n = len(a)
+    det = 1
+    for k in range(n):
+        p = max(range(k, n), key=lambda i: abs(a[i][k]))
+        if a[p][k] == 0: return 0
+        if p != k:
+            a[k], a[p] = a[p], a[k]
+            det = -det
+
+        pivot = a[k][k]
+        det *= pivot
+        row_k = a[k]
+        for i in range(k+1, n):
+            row_i = a[i]
+            factor = row_i[k] / pivot
+            if factor != 0:
+                row_i[k+1:] = [x - factor*y for x, y in zip(row_i[k+1:], row_k[k+1:])]
+    return det
+
+
 class Matrix(Generic[T]):
     """
     n x m row-major matrix
+
+    `backend` picks how the entries are stored:
+    - "list": a list of `Vector`s. Works with anything (`Term`, `Fraction`...)
+    - "numpy": one contiguous ndarray. Only used if NumPy is installed and every
+      entry is a plain int or float; otherwise it silently falls back to "list"
+      Int products and sums that could overflow int64 are done with Python ints
+      instead, so the result switches to "list" if it doesn't fit
+    - "exact": a list of `Vector`s of `Fraction`s (converted on creation). Row
+      reduction, inverses and determinants are exact and never rounded. Falls
+      back to "list" if an entry isn't a number
+    If `backend` is `None`, `default_backend` is used. Passing an ndarray as
+    `vecs` always uses the "numpy" backend.
     """
 
-    rows: list[Vector[T]]
-    size: tuple[int, int]
+    _rows: list[Vector[T]]
+    _array: Optional[np.ndarray]
+    _exact: bool
+
+    def __init__(self, vecs: Union[list[list[T]], list[Vector[T]]], backend: Optional[str] = None):
+        if backend == None: backend = default_backend
+        assert backend in BACKENDS, f"Unknown backend {backend}"
+
+        self._array = None
+        self._exact = False
+        if backend == "numpy" or _is_array(vecs):
+            self._array = _to_array(vecs)
+            if self._array is not None:
+                return
+        elif backend == "exact":
+            fractions = _to_fractions(vecs)
+            if fractions is not None:
+                vecs = fractions
+                self._exact = True
 
-    def __init__(self, vecs: Union[list[list[T]], list[Vector[T]]]):
         size = (len(vecs), len(vecs[0]))
         for i in range(len(vecs)):
             assert len(vecs[i]) == size[1], "All rows must be the same size"
@@ -128,11 +815,45 @@ class Matrix(Generic[T]):
             if isinstance(vecs[i], list):
                 vecs[i] = Vector(vecs[i])
 
-        self.rows = vecs
+        self._rows = vecs
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """(rows, columns)"""
+        if self._array is not None: return self._array.shape
+        return (len(self._rows), len(self._rows[0]))
+
+    @property
+    def backend(self) -> str:
+        if self._array is not None: return "numpy"
+        return "exact" if self._exact else "list"
+
+    @property
+    def rows(self) -> list[Vector[T]]:
+        """The rows of the matrix
+
+        With the "numpy" backend these are `Vector`s over views of the ndarray, so
+        setting an element writes through but replacing a row in the list doesn't
+        """
+        if self._array is not None:
+            return [Vector(row) for row in self._array]
+        return self._rows
+
+    @rows.setter
+    def rows(self, rows: list[Vector[T]]) -> None:
+        if self._array is not None:
+            self._array = _to_array(rows)
+            if self._array is not None: return
+            rows = [r if isinstance(r, Vector) else Vector(r) for r in rows]
+        self._rows = rows
+
+    def _as_array(self) -> Optional[np.ndarray]:
+        if self._array is not None: return self._array
+        return _to_array(self._rows)
 
     @staticmethod
-    def identity(n: int) -> Matrix[int]:
-        return Matrix([[int(i==j) for i in range(n)] for j in range(n)])
+    def identity(n: int, backend: Optional[str] = None) -> Matrix[int]:
+        return Matrix([[int(i==j) for i in range(n)] for j in range(n)], backend)
     
     def __str__(self) -> str:
         return str(self.rows)
@@ -141,6 +862,7 @@ class Matrix(Generic[T]):
         return f"Matrix({str(self.as_list())})"
 
     def __getitem__(self, i: int) -> Vector[T]:
+        if self._array is not None: return Vector(self._array[i])
         return self.rows[i]
     
     def print(self, name: str = "") -> None:
@@ -163,35 +885,53 @@ class Matrix(Generic[T]):
             print()
 
     def as_list(self) -> list[list[T]]:
+        if self._array is not None: return self._array.tolist()
         return [list(r) for r in self.rows]
 
     def transpose(self) -> Matrix[T]:
-        return Matrix([list(row) for row in zip(*self.rows)])
+        if self._array is not None: return Matrix(np.ascontiguousarray(self._array.T))
+        return Matrix([list(row) for row in zip(*self.rows)], self.backend)
 
     def __mul__(self, other: Union[Matrix[T], Vector[T], T]) -> Matrix[T]:
-        if type(other) == Matrix:
+        if isinstance(other, SparseMatrix):
+            return NotImplemented
+        if isinstance(other, Matrix):
             assert len(self.rows[0]) == len(other.rows), "Cannot multiply matrices of incompatible sizes"
-            res = []
-            other = other.transpose()
-            for col in other.rows: # cols bc transposed
-                new_col = []
-                for i in range(len(self.rows)):
-                    new_col.append(sum([self.rows[i][j]*col[j] for j in range(len(col))]))
-                res.append(new_col)
-            return Matrix(res).transpose()
-
-        elif type(other) == Vector:
+            if self._array is not None or other._array is not None:
+                a, b = self._as_array(), other._as_array()
+                if a is not None and b is not None:
+                    if _max_abs_int(a) * _max_abs_int(b) * a.shape[1] <= _INT64_MAX:
+                        return Matrix(a @ b)
+                    # int64 could overflow, so multiply Python ints. Stays "numpy" if the result fits
+                    return Matrix(_matmul(a.tolist(), b.tolist()), "numpy")
+
+            if self._array is not None or other._array is not None:
+                # One side is an ndarray that couldn't be combined with the other (big ints...)
+                return Matrix(_matmul(self.as_list(), other.as_list()), self.backend)
+            return Matrix(_matmul([r.data for r in self.rows], [r.data for r in other.rows]), self.backend)
+
+        elif isinstance(other, Vector):
             assert len(self.rows[0]) == len(other), "Cannot multiply matrix with vector of incompatible size"
+            if self._array is not None:
+                v = other.data if _is_array(other.data) else _to_array([other.data])
+                if v is not None and _max_abs_int(self._array) * _max_abs_int(v) * len(other) <= _INT64_MAX:
+                    return Vector(self._array @ v.reshape(-1))
+
+            data = other.data.tolist() if _is_array(other.data) else other.data
             res = []
-            for row in self.rows:
+            for row in self.as_list():
                 total = 0
-                for i in range(len(other)):
-                    total += row[i] * other[i]
+                for i in range(len(data)):
+                    total += row[i] * data[i]
                 res.append(total)
             return Vector(res)
 
         else:
-            return Matrix([[self.rows[i][j] * other for j in range(len(self.rows[i]))] for i in range(len(self.rows))])
+            if self._array is not None and _is_scalar(other) \
+                    and _max_abs_int(self._array) * _max_abs_int(other) <= _INT64_MAX:
+                return Matrix(self._array * other)
+            other = _as_python(other)
+            return Matrix([[x * other for x in row] for row in self.as_list()], self.backend)
     
     def __rmul__(self, other: Union[Matrix[T], Vector[T], T]) -> Matrix[T]:
         if isinstance(other, Matrix):
@@ -202,13 +942,23 @@ class Matrix(Generic[T]):
 
     def __truediv__(self, other):
         # TODO: Make this function not dumb
+        if self._exact and isinstance(other, int):
+            return self.__mul__(Fraction(1, other))
         return self.__mul__(1/other)
 
     def __add__(self, other: Union[Matrix[T], T]) -> Matrix[T]:
-        if type(other) == Matrix:
-            return Matrix([[self.rows[i][j] + other.rows[i][j] for j in range(len(self.rows[i]))] for i in range(len(self.rows))])
+        if isinstance(other, Matrix):
+            if self._array is not None or other._array is not None:
+                a, b = self._as_array(), other._as_array()
+                if a is not None and b is not None and _max_abs_int(a) + _max_abs_int(b) <= _INT64_MAX:
+                    return Matrix(a + b)
+            return Matrix([[x + y for x, y in zip(r1, r2)] for r1, r2 in zip(self.as_list(), other.as_list())], self.backend)
         else:
-            return Matrix([[self.rows[i][j] + other for j in range(len(self.rows[i]))] for i in range(len(self.rows))])
+            if self._array is not None and _is_scalar(other) \
+                    and _max_abs_int(self._array) + _max_abs_int(other) <= _INT64_MAX:
+                return Matrix(self._array + other)
+            other = _as_python(other)
+            return Matrix([[x + other for x in row] for row in self.as_list()], self.backend)
     
     def __sub__(self, other: Union[Matrix[T], T]) -> Matrix[T]:
         return self.__add__(other * -1)
@@ -216,66 +966,147 @@ class Matrix(Generic[T]):
     def __neg__(self) -> Matrix[T]:
         return self * -1
     
-    def __pow__(self, n: int) -> Matrix[T]:
+    def __mod__(self, mod: int) -> Matrix[T]:
+        """Reduces every entry modulo `mod`"""
+        if self._array is not None: return Matrix(self._array % mod)
+        return Matrix([[x % mod for x in row] for row in self.rows], self.backend)
+
+    def __pow__(self, n: int, mod: Optional[int] = None) -> Matrix[T]:
+        """Exponentiation by squaring, so only O(log n) matrix products
+
+        `pow(M, n, mod)` reduces the entries modulo `mod` after every product so
+        (integer) entries never grow past `mod`. A negative `n` uses the inverse.
+        With the "numpy" backend every product checks its int64 bound, so entries
+        that outgrow int64 (walk counts, Fibonacci numbers...) continue as Python
+        ints instead of wrapping around, at any step of the squaring.
+        """
+        size = len(self.rows)
+        if size != len(self.rows[0]): raise ValueError("Matrix must be square to be raised to a power")
+        if n < 0:
+            if mod != None: raise ValueError("Negative powers aren't supported with a modulus")
+            return self.inverse() ** -n
         if n == 0:
-            if len(self.rows) != len(self.rows[0]): raise ValueError("Matrix must be square to have a 0 power")
-            return Matrix.identity(len(self.rows))
-        if n == 1:
-            return self.copy()
-        else:
-            res = self
-            for _ in range(1, n):
-                res *= self
-            return res 
+            res = Matrix.identity(size, self.backend)
+            return res if mod == None else res % mod
+
+        base = self if mod == None else self % mod
+
+        res = None
+        while True:
+            if n & 1:
+                res = base if res is None else res * base
+                if mod != None: res = res % mod
+            n >>= 1
+            if n == 0: break
+            base = base * base
+            if mod != None: base = base % mod
+            if base._array is None and res is not None and res._array is not None:
+                # `base` outgrew int64; move `res` to Python ints once instead of in every product
+                res = Matrix(res.as_list(), "list")
+        return self.copy() if res is self else res
 
     def round(self, dec: int = 0) -> None:
+        if self._array is not None:
+            self._array = np.round(self._array, dec)
+            return
         for r in range(len(self.rows)):
             for c in range(len(self.rows[r])):
                 self.rows[r][c] = round(self.rows[r][c]*pow(10,dec))/pow(10,dec)
     
-    def to_echelon_form(self) -> None:
-        i = 1
-        while 1:
-            self.rows.sort(key = lambda x: abs(x).data, reverse=True)
-            
-            if i == len(self.rows):
-                break
-            elif self.rows[i].is_zero():
-                break
-            elif self.rows[i].index_first_nonzero() == self.rows[i-1].index_first_nonzero():
-                scaling_factor = self.rows[i].first_nonzero() / self.rows[i-1].first_nonzero()
-                self.rows[i] -= self.rows[i-1] * scaling_factor
-            else:
-                i += 1
-        for i in range(len(self.rows)):
-            first_nonzero = self.rows[i].first_nonzero()
-            if first_nonzero != None:
-                self.rows[i] /= first_nonzero
+    def _row_reduce(self, reduced: bool) -> tuple[list[int], int]:
+        if self._array is not None:
+            self._array, pivots = _np_row_reduce(self._array, reduced)
+        else:
+            a = [list(row) for row in self._rows]
+            pivots = _row_reduce(a, reduced)
+            self._rows = [Vector(row) for row in a]
+        return pivots, len(pivots)
 
-    def to_reduced_echelon_form(self, already_echelon_form: bool = False) -> None:
-        if not already_echelon_form:
-            self.to_echelon_form()
+    def to_echelon_form(self) -> tuple[list[int], int]:
+        """Puts the matrix into row echelon form (with leading 1s) in place
 
-        for i in range(len(self.rows)):
-            pivot_point = self.rows[i].index_first_nonzero()
-            if pivot_point == None:
-                break
+        Returns the pivot columns and the rank
+        """
+        return self._row_reduce(reduced=False)
 
-            for j in range(i-1,-1,-1):
-                scaling_factor = self.rows[j][pivot_point] / self.rows[i][pivot_point]
-                self.rows[j] -= self.rows[i] * scaling_factor
+    def to_reduced_echelon_form(self, already_echelon_form: bool = False) -> tuple[list[int], int]:
+        """Puts the matrix into reduced row echelon form in place
+
+        Returns the pivot columns and the rank. `already_echelon_form` is only kept
+        for compatibility; the elimination finds the existing pivots right away
+        """
+        return self._row_reduce(reduced=True)
+
+    def rank(self) -> int:
+        return self.copy()._row_reduce(reduced=False)[1]
+
+    def determinant(self, iterating_rows: bool = True, other_index: int = 0, method: str = "auto") -> T:
+        """Returns the determinant of a square matrix
+
+        `method` can be:
+        - "bareiss": exact fraction-free elimination, O(n^3) operations. Works for
+          ints, `Fraction`s and symbolic entries (`Variable`s, `Term`s and
+          `Equation`s, which are divided exactly as polynomials)
+        - "berkowitz": the constant term of the characteristic polynomial, O(n^4)
+          but division-free. Faster than "bareiss" for symbolic entries since it
+          only multiplies by the (small) entries of the matrix
+        - "lu": elimination with partial pivoting for floats, O(n^3)
+        - "cofactor": cofactor expansion along row (or column if `iterating_rows`
+          is `False`) `other_index`. O(n!), only kept as an opt-in
+        - "auto": "lu" for floats, "berkowitz" for symbolic entries and "bareiss"
+          for everything else
+        """
+        assert method in ("auto", "bareiss", "berkowitz", "lu", "cofactor"), f"Unknown determinant method {method}"
+        assert len(self.rows) == len(self.rows[0]), "Matrix must be square to have a determinant"
 
-    def determinant(self, iterating_rows: bool = True, other_index: int = 0) -> T:
+        if method == "auto":
+            if self._array is not None:
+                method = "lu" if self._array.dtype.kind == 'f' else "bareiss"
+            else:
+                method = {"float": "lu", "other": "berkowitz"}.get(_numeric_kind(self.rows), "bareiss")
+
+        if method == "lu":
+            if self._array is not None: return float(np.linalg.det(self._array))
+            if _parallel(len(self.rows)) is not None: return self.lu().determinant()
+            return _lu_determinant(self.as_list())
+        if method == "berkowitz":
+            a = self.as_list()
+            symbolic = _numeric_kind(a) == "other"
+            if symbolic:
+                a = [[Polynomial.coerce(x) for x in row] for row in a]
+            det = _berkowitz(a)[-1] * (-1)**len(a)
+            return Polynomial.coerce(det).to_expression() if symbolic else det
+        if method == "bareiss":
+            a = self.as_list()
+            kind = _numeric_kind(a)
+            if kind == "other":
+                a = [[Polynomial.coerce(x) for x in row] for row in a]
+                return Polynomial.coerce(_bareiss_determinant(a, Polynomial.exact_div)).to_expression()
+            if kind == "float":
+                return _bareiss_determinant(a, operator.truediv)
+            if kind == "rational":
+                # det(A) = det(D A) / det(D) where D scales each row to integers
+                scale = 1
+                int_rows = []
+                for row in a:
+                    row, row_scale = _integer_row(row)
+                    int_rows.append(row)
+                    scale *= row_scale
+                return Fraction(_bareiss_determinant(int_rows, operator.floordiv), scale)
+            return _bareiss_determinant([[int(x) for x in row] for row in a], operator.floordiv)
+
+        if len(self.rows) == 1:
+            return self.rows[0][0]
         if (len(self.rows) == 2 and len(self.rows[0]) == 2):
             return self.rows[0][0] * self.rows[1][1] - self.rows[0][1] * self.rows[1][0]
 
         result = 0
         if iterating_rows:
             for i in range(len(self.rows)):
-                result += self.cofactor(i, other_index) * self[i][other_index]
+                result += self.cofactor(i, other_index, method) * self[i][other_index]
         else:
             for j in range(len(self.rows[0])):
-                result += self.cofactor(other_index, j) * self[other_index][j]
+                result += self.cofactor(other_index, j, method) * self[other_index][j]
         return result
         
     def excluding(self, i: int, j: int) -> Matrix[T]:
@@ -290,27 +1121,69 @@ class Matrix(Generic[T]):
                     if c != j:
                         row.append(self.rows[r][c])
                 res.append(row)
-        return Matrix(res)
+        return Matrix(res, self.backend)
+
+    def characteristic_polynomial(self, variable: str = "t") -> Equation:
+        """Returns det(`variable` * I - self) as an `Equation`
 
-    def cofactor(self, i: int, j: int) -> T:
-        "i & j are zero indexed"
+        Uses Berkowitz's division-free algorithm, so entries can be numbers or
+        symbolic (`Variable`s, `Term`s and `Equation`s) and ints stay exact
+        """
+        n, m = self.size
+        assert n == m, "Matrix must be square to have a characteristic polynomial"
+        a = self.as_list()
+        if _numeric_kind(a) == "other":
+            a = [[Polynomial.coerce(x) for x in row] for row in a]
+        coefficients = _berkowitz(a)
+
+        res = Polynomial()
+        for i, c in enumerate(coefficients):
+            res.add_scaled(Polynomial.coerce(c) * Polynomial.variable(variable, n-i) if i < n else c)
+        return Equation.from_polynomial(res)
+
+    def cofactor(self, i: int, j: int, method: str = "auto") -> T:
+        "i & j are zero indexed. `method` is passed on to `determinant`"
         cf_mat = self.excluding(i, j)
-        return cf_mat.determinant() * (-1)**(i+j)
+        return cf_mat.determinant(method=method) * (-1)**(i+j)
 
     def add_column(self, col: Union[list[T], Vector[T]]) -> None:
         assert len(col) == len(self.rows), "invalid column size"
+        if self._array is not None:
+            c = col.data if isinstance(col, Vector) else col
+            c = c if _is_array(c) else _to_array([c])
+            if c is not None:
+                self._array = np.column_stack((self._array, c.reshape(-1)))
+                return
+            # The new column can't be stored in the ndarray so fall back to lists
+            self._rows = [Vector(r) for r in self._array.tolist()]
+            self._array = None
+
         for i in range(len(self.rows)):
-            self.rows[i].append(col[i])
+            self.rows[i].append(Fraction(col[i]) if self._exact else col[i])
 
     def inverse(self) -> Matrix[T]:
-        m = self.transpose()
-        m.rows.extend(Matrix.identity(len(self.rows)))
-        m = m.transpose()
-        m.to_reduced_echelon_form()
-        m = m.transpose()
-        m.rows = m.rows[len(self.rows):]
-        m = m.transpose()
-        return m
+        n = len(self.rows)
+        assert n == len(self.rows[0]), "Matrix must be square to have an inverse"
+        if self._array is not None:
+            # LAPACK only rejects exactly zero pivots, so check against EPSILON like the other backends
+            if self.lu().singular: raise ValueError("Matrix is not invertible")
+            try:
+                return Matrix(_round_near_int(np.linalg.inv(self._array)))
+            except np.linalg.LinAlgError:
+                raise ValueError("Matrix is not invertible")
+
+        if _parallel(n) is not None and _numeric_kind(self._rows) in ("int", "float"):
+            # Blocked LU splits its work over the pool, then solve against I
+            lu = self.lu()
+            if lu.singular: raise ValueError("Matrix is not invertible")
+            return Matrix(lu.solve(Matrix([[int(i==j) for j in range(n)] for i in range(n)])).as_list(), self.backend)
+
+        # Row reduce [A | I] into [I | A^-1]
+        a = [list(row) + [int(i==j) for j in range(n)] for i, row in enumerate(self._rows)]
+        pivots = _row_reduce(a, reduced=True)
+        if pivots[:n] != list(range(n)):
+            raise ValueError("Matrix is not invertible")
+        return Matrix([row[n:] for row in a], self.backend)
     
     def copy(self) -> Matrix[T]:
         """Returns a copy of `self`
@@ -318,7 +1191,1183 @@ class Matrix(Generic[T]):
         The copy is somewhat deep; if `T` is an object it will be shallow-copied
         but the rows and columns will be deep-copied
         """
-        Matrix([r.copy() for r in self.rows])
+        if self._array is not None: return Matrix(self._array.copy())
+        return Matrix([r.copy() for r in self.rows], self.backend)
+
+    def lu(self) -> LUDecomposition[T]:
+        return LUDecomposition(self)
+
+    def qr(self, method: str = "householder") -> QRDecomposition:
+        return QRDecomposition(self, method)
+
+    def eig(self, symmetric: Optional[bool] = None) -> EigenDecomposition:
+        return EigenDecomposition(self, symmetric)
+
+    def eigenvalues(self, symmetric: Optional[bool] = None) -> list:
+        return EigenDecomposition(self, symmetric, vectors=False).values
+
+    def solve(self, b: Union[Vector[T], Matrix[T], list[T]]) -> Union[Vector[T], Matrix[T]]:
+        """Solves `self` * x = `b`
+
+        `b` can be a `Vector` or a `Matrix` with one right-hand side per column.
+        Square matrices are solved with an LU decomposition; taller ones get the
+        least squares solution through a QR decomposition. To solve against many
+        right-hand sides one at a time, keep the `lu()` or `qr()` object around
+        instead so the O(n^3) factorization is only done once.
+        """
+        n, m = self.size
+        if n == m: return self.lu().solve(b)
+        return self.qr().solve(b)
+
+
+def _split_rhs(b: Union[Vector[T], Matrix[T], list[T]]) -> tuple[list[list[T]], bool]:
+    """Returns `b` as rows of right-hand sides and whether `b` was a single vector"""
+    if isinstance(b, Matrix): return b.as_list(), False
+    return [[x] for x in b], True
+
+def _join_rhs(rows: Any, single: bool) -> Union[Vector[T], Matrix[T]]:
+    if _is_array(rows):
+        return Vector(rows[:, 0]) if single else Matrix(rows)
+    return Vector([row[0] for row in rows]) if single else Matrix(rows)
+
+
+def _lu_solve_columns(lu: list[list[T]], perm: list[int], cols: list[list[T]]) -> list[list[T]]:
+    """Forward substitution with L then back substitution with U, one right-hand side column at a time"""
+    n = len(lu)
+    res = []
+    for col in cols:
+        y = [col[p] for p in perm]
+        for i in range(1, n):
+            y[i] -= sum(map(operator.mul, lu[i][:i], y[:i]))
+        for i in range(n-1, -1, -1):
+            y[i] = (y[i] - sum(map(operator.mul, lu[i][i+1:], y[i+1:]))) / lu[i][i]
+        res.append(y)
+    return res
+
+
+class LUDecomposition(Generic[T]):
+    """PA = LU of a square matrix with partial pivoting
+
+    The factorization is done once (O(n^3)) and every `solve` after that only costs
+    O(n^2) per right-hand side. L (with an implied unit diagonal) and U are packed
+    into one table. Ints are solved in floats, `Fraction`s stay exact.
+    """
+
+    n: int
+    perm: list[int]
+    sign: int
+    singular: bool
+
+    def __init__(self, matrix: Matrix[T]) -> None:
+        self.n, m = matrix.size
+        assert self.n == m, "Only square matrices have an LU decomposition"
+        n = self.n
+        self.perm = list(range(n))
+        self.sign = 1
+        self.singular = False
+
+        if matrix._array is not None:
+            self._kind = "float"
+            lu = matrix._array.astype(np.float64)
+            for k in range(n):
+                p = k + int(np.argmax(np.abs(lu[k:, k])))
+                if abs(lu[p, k]) <= EPSILON:
+                    self.singular = True
+                    continue
+                if p != k:
+                    lu[[k, p]] = lu[[p, k]]
+                    self._swap(k, p)
+                lu[k+1:, k] /= lu[k, k]
+                lu[k+1:, k+1:] -= np.outer(lu[k+1:, k], lu[k, k+1:])
+            self._lu = lu
+            return
+
+        self._kind = _numeric_kind(matrix.rows)
+        # Ints are divided in floats too, so only `Fraction`s and symbolic entries are exact
+        tolerance = EPSILON if self._kind in ("int", "float") else 0
+        lu = [list(row) for row in matrix.rows]
+        pool = _parallel(n)
+        if pool is not None:
+            self._factor_blocked(lu, tolerance, pool)
+            self._lu = lu
+            return
+        for k in range(n):
+            p = max(range(k, n), key=lambda i: abs(lu[i][k]))
+            if abs(lu[p][k]) <= tolerance:
+                self.singular = True
+                continue
+            if p != k:
+                lu[k], lu[p] = lu[p], lu[k]
+                self._swap(k, p)
+
+            pivot = lu[k][k]
+            tail = lu[k][k+1:]
+            for i in range(k+1, n):
+                row_i = lu[i]
+                factor = row_i[k] / pivot
+                row_i[k] = factor
+                if factor != 0:
+                    row_i[k+1:] = [x - factor*y for x, y in zip(row_i[k+1:], tail)]
+        self._lu = lu
+
+    def _factor_blocked(self, lu: list[list[T]], tolerance: float, pool: concurrent.futures.ProcessPoolExecutor) -> None:
+        """
+        Right-looking blocked LU of `lu` in place, for parallel mode
+
+        For every panel of `MATMUL_BLOCK_SIZE` columns: factor the panel (with
+        partial pivoting over all the rows below), solve for that block row of U,
+        then subtract L21 U12 from the trailing submatrix. That last O(n^3) part is
+        split into blocks of rows over the process pool
+        """
+        n = self.n
+        for k0 in range(0, n, MATMUL_BLOCK_SIZE):
+            k1 = min(k0 + MATMUL_BLOCK_SIZE, n)
+            for k in range(k0, k1):
+                p = max(range(k, n), key=lambda i: abs(lu[i][k]))
+                if abs(lu[p][k]) <= tolerance:
+                    self.singular = True
+                    for i in range(k+1, n): lu[i][k] = 0
+                    continue
+                if p != k:
+                    lu[k], lu[p] = lu[p], lu[k]
+                    self._swap(k, p)
+                pivot = lu[k][k]
+                panel = lu[k][k+1:k1]
+                for i in range(k+1, n):
+                    row_i = lu[i]
+                    factor = row_i[k] = row_i[k] / pivot
+                    if factor != 0:
+                        row_i[k+1:k1] = [x - factor*y for x, y in zip(row_i[k+1:k1], panel)]
+
+            # U12 = L11^-1 A12
+            for k in range(k0, k1):
+                tail = lu[k][k1:]
+                for i in range(k+1, k1):
+                    factor = lu[i][k]
+                    if factor != 0:
+                        lu[i][k1:] = [x - factor*y for x, y in zip(lu[i][k1:], tail)]
+
+            if k1 == n: break
+            u = [row[k1:] for row in lu[k0:k1]]
+            rows = [row[k1:] for row in lu[k1:]]
+            factors = [row[k0:k1] for row in lu[k1:]]
+            if n - k1 >= PARALLEL_THRESHOLD // 2:
+                row_blocks = _chunks(rows, PARALLEL_WORKERS)
+                factor_blocks = _chunks(factors, PARALLEL_WORKERS)
+                updated = []
+                for block in pool.map(_trailing_update, row_blocks, factor_blocks, [u]*len(row_blocks)):
+                    updated.extend(block)
+            else:
+                updated = _trailing_update(rows, factors, u)
+            for row, new in zip(lu[k1:], updated):
+                row[k1:] = new
+
+    def _swap(self, i: int, j: int) -> None:
+        self.perm[i], self.perm[j] = self.perm[j], self.perm[i]
+        self.sign = -self.sign
+
+    def L(self) -> Matrix[T]:
+        n = self.n
+        if _is_array(self._lu): return Matrix(np.tril(self._lu, -1) + np.eye(n))
+        return Matrix([[1 if i == j else (self._lu[i][j] if j < i else 0) for j in range(n)] for i in range(n)])
+
+    def U(self) -> Matrix[T]:
+        n = self.n
+        if _is_array(self._lu): return Matrix(np.triu(self._lu))
+        return Matrix([[self._lu[i][j] if j >= i else 0 for j in range(n)] for i in range(n)])
+
+    def determinant(self) -> T:
+        if self.singular: return 0
+        det = self.sign
+        for i in range(self.n): det *= self._lu[i][i]
+        return float(det) if _is_array(self._lu) else det
+
+    def solve(self, b: Union[Vector[T], Matrix[T], list[T]]) -> Union[Vector[T], Matrix[T]]:
+        """Solves A x = `b`. `b` can be a `Vector` or a `Matrix` of right-hand side columns"""
+        if self.singular: raise ValueError("Matrix is singular")
+        rows, single = _split_rhs(b)
+        assert len(rows) == self.n, "Right-hand side has the wrong number of rows"
+        n = self.n
+        lu = self._lu
+
+        if _is_array(lu):
+            y = np.array(rows, dtype=np.float64)[self.perm]
+            for i in range(n):
+                y[i] -= lu[i, :i] @ y[:i]
+            for i in range(n-1, -1, -1):
+                y[i] = (y[i] - lu[i, i+1:] @ y[i+1:]) / lu[i, i]
+            return _join_rhs(_round_near_int(y), single)
+
+        cols = list(zip(*rows))
+        pool = _parallel(n) if len(cols) > 1 else None
+        if pool is not None:
+            col_blocks = _chunks(cols, PARALLEL_WORKERS)
+            res = []
+            for block in pool.map(_lu_solve_columns, [lu]*len(col_blocks), [self.perm]*len(col_blocks), col_blocks):
+                res.extend(block)
+        else:
+            res = _lu_solve_columns(lu, self.perm, cols)
+
+        res = [list(row) for row in zip(*res)]
+        if self._kind != "rational": _round_near_int_rows(res)
+        return _join_rhs(res, single)
+
+
+class QRDecomposition:
+    """A = QR of an m x n matrix (m >= n)
+
+    `method` is "householder" (the default, most accurate) or "mgs" (modified
+    Gram-Schmidt, which is cheaper and builds Q explicitly). Either way Q and R
+    come out of the same pass over the columns. For Householder only the
+    reflectors are kept instead of Q, so `solve` costs O(mn) per right-hand side.
+    `solve` returns the least squares solution when m > n. Everything is done in floats.
+    """
+
+    m: int
+    n: int
+    method: str
+
+    def __init__(self, matrix: Matrix, method: str = "householder") -> None:
+        assert method in ("householder", "mgs"), f"Unknown QR method {method}"
+        self.m, self.n = matrix.size
+        self.method = method
+        assert self.m >= self.n, "QR decomposition needs at least as many rows as columns"
+        m, n = self.m, self.n
+        self._q = None
+        self._q_cols = None
+        self._reflectors = None
+
+        if matrix._array is not None:
+            a = matrix._array.astype(np.float64)
+            if method == "householder":
+                self._q, self._r = np.linalg.qr(a)
+                return
+            q = a.copy()
+            r = np.zeros((n, n))
+            for k in range(n):
+                r[k, k] = np.sqrt(q[:, k] @ q[:, k])
+                if r[k, k] != 0: q[:, k] /= r[k, k]
+                r[k, k+1:] = q[:, k] @ q[:, k+1:]
+                q[:, k+1:] -= np.outer(q[:, k], r[k, k+1:])
+            self._q, self._r = q, r
+            return
+
+        # Work on columns since both methods go column by column
+        cols = [[float(x) for x in col] for col in zip(*matrix.rows)]
+
+        if method == "mgs":
+            r = [[0.0]*n for _ in range(n)]
+            for k in range(n):
+                q = cols[k]
+                norm = math.sqrt(sum(map(operator.mul, q, q)))
+                r[k][k] = norm
+                if norm != 0: q[:] = [x / norm for x in q]
+                # Orthogonalize the remaining columns against q right away
+                for j in range(k+1, n):
+                    col = cols[j]
+                    r[k][j] = s = sum(map(operator.mul, q, col))
+                    if s != 0: col[:] = [c - s*x for c, x in zip(col, q)]
+            self._q_cols = cols
+            self._r = r
+            return
+
+        reflectors = []
+        for k in range(n):
+            v = cols[k][k:]
+            norm = math.sqrt(sum(x*x for x in v))
+            if norm == 0:
+                reflectors.append(None)
+                continue
+            # Reflect onto -sign(x_0) * |x| e_1 to avoid cancellation
+            alpha = -norm if v[0] >= 0 else norm
+            v[0] -= alpha
+            vv = sum(x*x for x in v)
+            for j in range(k, n):
+                col = cols[j]
+                s = 2 * sum(map(operator.mul, v, col[k:])) / vv
+                col[k:] = [c - s*a for c, a in zip(col[k:], v)]
+            reflectors.append((v, vv))
+
+        self._reflectors = reflectors
+        self._r = [[cols[j][i] if j >= i else 0.0 for j in range(n)] for i in range(n)]
+
+    def _apply_qt(self, y: list[float]) -> list[float]:
+        """Returns the first n entries of Q^T y. `y` is overwritten"""
+        if self._q_cols is not None:
+            # Subtract each projection as it's found (modified Gram-Schmidt again)
+            res = []
+            for q in self._q_cols:
+                s = sum(map(operator.mul, q, y))
+                res.append(s)
+                if s != 0: y[:] = [c - s*x for c, x in zip(y, q)]
+            return res
+
+        for k, reflector in enumerate(self._reflectors):
+            if reflector == None: continue
+            v, vv = reflector
+            s = 2 * sum(map(operator.mul, v, y[k:])) / vv
+            y[k:] = [c - s*a for c, a in zip(y[k:], v)]
+        return y[:self.n]
+
+    def _apply_q(self, y: list[float]) -> None:
+        """y = Q y in place (Householder only)"""
+        for k in range(len(self._reflectors)-1, -1, -1):
+            reflector = self._reflectors[k]
+            if reflector == None: continue
+            v, vv = reflector
+            s = 2 * sum(map(operator.mul, v, y[k:])) / vv
+            y[k:] = [c - s*a for c, a in zip(y[k:], v)]
+
+    def Q(self) -> Matrix[float]:
+        """The thin m x n Q"""
+        if self._q is not None: return Matrix(self._q.copy())
+        if self._q_cols is not None: return Matrix([list(col) for col in self._q_cols]).transpose()
+        cols = []
+        for j in range(self.n):
+            e = [0.0]*self.m
+            e[j] = 1.0
+            self._apply_q(e)
+            cols.append(e)
+        return Matrix(cols).transpose()
+
+    def R(self) -> Matrix[float]:
+        """The n x n upper triangular R"""
+        if self._q is not None: return Matrix(self._r.copy())
+        return Matrix([row.copy() for row in self._r])
+
+    def solve(self, b: Union[Vector, Matrix, list]) -> Union[Vector, Matrix]:
+        """Returns the x minimizing |A x - `b`|. `b` can be a `Vector` or a `Matrix` of right-hand side columns"""
+        rows, single = _split_rhs(b)
+        assert len(rows) == self.m, "Right-hand side has the wrong number of rows"
+        n = self.n
+        r = self._r
+
+        if self._q is not None:
+            y = self._q.T @ np.array(rows, dtype=np.float64)
+            if np.any(np.abs(np.diag(r)) <= EPSILON):
+                raise ValueError("Matrix doesn't have full column rank")
+            for i in range(n-1, -1, -1):
+                y[i] = (y[i] - r[i, i+1:] @ y[i+1:]) / r[i, i]
+            return _join_rhs(_round_near_int(y), single)
+
+        if any(abs(r[i][i]) <= EPSILON for i in range(n)):
+            raise ValueError("Matrix doesn't have full column rank")
+        cols = [[float(x) for x in col] for col in zip(*rows)]
+        res = []
+        for y in cols:
+            y = self._apply_qt(y)
+            x = [0.0]*n
+            for i in range(n-1, -1, -1):
+                x[i] = (y[i] - sum(map(operator.mul, r[i][i+1:], x[i+1:]))) / r[i][i]
+            res.append(x)
+        res = [list(row) for row in zip(*res)]
+        _round_near_int_rows(res)
+        return _join_rhs(res, single)
+
+
+def _hessenberg(a: list[list[float]]) -> None:
+    """Reduces the square matrix `a` to upper Hessenberg form (in place) with Householder reflections"""
+    n = len(a)
+    for k in range(n-2):
+        v = [a[i][k] for i in range(k+1, n)]
+        norm = math.sqrt(sum(abs(x)**2 for x in v))
+        if norm == 0: continue
+        alpha = -norm if v[0].real >= 0 else norm
+        v[0] -= alpha
+        vv = sum(abs(x)**2 for x in v)
+        if vv == 0: continue
+        # a = H a H with H = I - 2 v v^T / v^T v acting on rows/columns k+1..n-1
+        for j in range(k, n):
+            s = 2 * sum(x.conjugate()*a[k+1+i][j] for i, x in enumerate(v)) / vv
+            if s != 0:
+                for i, x in enumerate(v): a[k+1+i][j] -= s*x
+        for row in a:
+            s = 2 * sum(row[k+1+i]*x for i, x in enumerate(v)) / vv
+            if s != 0:
+                for i, x in enumerate(v): row[k+1+i] -= s*x.conjugate()
+        for i in range(k+2, n): a[i][k] = 0
+
+def _hessenberg_qr_eigenvalues(h: list[list[complex]], max_iter: int = 100) -> list[complex]:
+    """
+    Eigenvalues of the upper Hessenberg matrix `h` (overwritten) by QR iteration
+
+    Each step is a Givens-rotation QR of h - mu I (O(n^2) on a Hessenberg matrix)
+    with a Wilkinson shift mu, done in complex arithmetic so complex eigenvalues
+    of real matrices just come out. Converged eigenvalues are deflated off the
+    bottom of the active block.
+    """
+    n = len(h)
+    values = []
+    hi = n - 1
+    iterations = 0
+    while hi >= 0:
+        # Find the top of the active (unreduced) block
+        lo = hi
+        while lo > 0:
+            if abs(h[lo][lo-1]) <= MACHINE_EPSILON * (abs(h[lo][lo]) + abs(h[lo-1][lo-1]) or 1):
+                h[lo][lo-1] = 0
+                break
+            lo -= 1
+        if lo == hi:
+            values.append(h[hi][hi])
+            hi -= 1
+            iterations = 0
+            continue
+        iterations += 1
+        if iterations > max_iter: raise ValueError("QR iteration didn't converge")
+
+        a, b, c, d = h[hi-1][hi-1], h[hi-1][hi], h[hi][hi-1], h[hi][hi]
+        if iterations % 11 == 0:
+            # Exceptional shift to get out of cycles
+            mu = d + abs(c)
+        else:
+            half_tr = (a + d) / 2
+            disc = cmath.sqrt(half_tr*half_tr - (a*d - b*c))
+            mu = half_tr + disc if abs(half_tr + disc - d) < abs(half_tr - disc - d) else half_tr - disc
+
+        for k in range(lo, hi+1): h[k][k] -= mu
+        rotations = []
+        for k in range(lo, hi):
+            x, y = h[k][k], h[k+1][k]
+            r = math.hypot(abs(x), abs(y))
+            if r == 0:
+                rotations.append((1, 0))
+                continue
+            cs, sn = x / r, y / r
+            rotations.append((cs, sn))
+            row_k, row_k1 = h[k], h[k+1]
+            for j in range(k, hi+1):
+                u, v = row_k[j], row_k1[j]
+                row_k[j] = cs.conjugate()*u + sn.conjugate()*v
+                row_k1[j] = -sn*u + cs*v
+        for k, (cs, sn) in enumerate(rotations, lo):
+            for i in range(lo, min(k+2, hi)+1):
+                row = h[i]
+                u, v = row[k], row[k+1]
+                row[k] = cs*u + sn*v
+                row[k+1] = -sn.conjugate()*u + cs.conjugate()*v
+        for k in range(lo, hi+1): h[k][k] += mu
+    return values
+
+def _jacobi_eigen(a: list[list[float]], tol: float = 1e-14, max_sweeps: int = 100) -> tuple[list[float], list[list[float]]]:
+    """
+    Eigenvalues and eigenvectors (columns of the returned matrix) of the symmetric
+    matrix `a` (overwritten) by cyclic Jacobi rotations
+
+    Every rotation zeroes one off-diagonal pair; a sweep over all the pairs is
+    O(n^3) and the off-diagonal part converges quadratically, so it's usually
+    done in 5-10 sweeps. Very accurate, even for small eigenvalues.
+    """
+    n = len(a)
+    v = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    scale = sum(x*x for row in a for x in row)
+    for _ in range(max_sweeps):
+        off = sum(a[i][j]**2 for i in range(n) for j in range(i+1, n))
+        if off <= tol*tol*scale: break
+        for p in range(n-1):
+            for q in range(p+1, n):
+                apq = a[p][q]
+                if apq == 0: continue
+                theta = (a[q][q] - a[p][p]) / (2*apq)
+                t = (1.0 if theta >= 0 else -1.0) / (abs(theta) + math.sqrt(theta*theta + 1))
+                c = 1 / math.sqrt(t*t + 1)
+                s = t*c
+                # a = J^T a J and v = v J for the rotation J in the (p, q) plane
+                for row in a:
+                    x, y = row[p], row[q]
+                    row[p] = c*x - s*y
+                    row[q] = s*x + c*y
+                row_p, row_q = a[p], a[q]
+                a[p] = [c*x - s*y for x, y in zip(row_p, row_q)]
+                a[q] = [s*x + c*y for x, y in zip(row_p, row_q)]
+                a[p][q] = a[q][p] = 0.0
+                for row in v:
+                    x, y = row[p], row[q]
+                    row[p] = c*x - s*y
+                    row[q] = s*x + c*y
+    return [a[i][i] for i in range(n)], v
+
+def _inverse_iteration(a: list[list[float]], value: complex, iterations: int = 3,
+                       against: list[list[complex]] = ()) -> tuple[list[complex], bool]:
+    """
+    Unit eigenvector of `a` for the (approximate) eigenvalue `value`
+
+    `against` are unit eigenvectors already found for the same eigenvalue. Every
+    step is orthogonalized against them, so a repeated eigenvalue gets a basis of
+    its eigenspace. Also returns `False` if nothing was left after that (the
+    eigenspace is too small, `a` is defective); the vector is then one of `against`
+    """
+    n = len(a)
+    norm = max(sum(abs(x) for x in row) for row in a) or 1
+    # Nudge the shift so (a - shift I) isn't exactly singular
+    shift = value + norm * MACHINE_EPSILON * 16
+    lu = [[a[i][j] - (shift if i == j else 0) for j in range(n)] for i in range(n)]
+    perm = list(range(n))
+    for k in range(n):
+        p = max(range(k, n), key=lambda i: abs(lu[i][k]))
+        if p != k:
+            lu[k], lu[p] = lu[p], lu[k]
+            perm[k], perm[p] = perm[p], perm[k]
+        if lu[k][k] == 0: lu[k][k] = norm * MACHINE_EPSILON
+        for i in range(k+1, n):
+            f = lu[i][k] = lu[i][k] / lu[k][k]
+            if f != 0:
+                row_i, row_k = lu[i], lu[k]
+                for j in range(k+1, n): row_i[j] -= f*row_k[j]
+
+    if against:
+        # A start that isn't in the span of `against`
+        rng = random.Random(len(against))
+        x = [rng.random() - 0.5 for _ in range(n)]
+    else:
+        x = [1.0] * n
+    independent = True
+    for _ in range(iterations):
+        y = [x[p] for p in perm]
+        for i in range(n):
+            y[i] -= sum(lu[i][j]*y[j] for j in range(i))
+        for i in range(n-1, -1, -1):
+            y[i] = (y[i] - sum(lu[i][j]*y[j] for j in range(i+1, n))) / lu[i][i]
+        if against:
+            before = math.sqrt(sum(abs(t)**2 for t in y))
+            rest = y
+            for u in against:
+                s = sum(w.conjugate()*t for w, t in zip(u, rest))
+                rest = [t - s*w for t, w in zip(rest, u)]
+            independent = math.sqrt(sum(abs(t)**2 for t in rest)) > math.sqrt(MACHINE_EPSILON) * before
+            if independent: y = rest
+        # Normalize with the largest entry made real and positive
+        big = max(y, key=abs)
+        scale = big / abs(big) * math.sqrt(sum(abs(t)**2 for t in y))
+        x = [t / scale for t in y]
+        if not independent: break
+    return x, independent
+
+def _real_if_close(x: complex, scale: float) -> Union[float, complex]:
+    if isinstance(x, complex) and abs(x.imag) <= 1e-9 * (scale or 1): return x.real
+    return x
+
+
+class EigenDecomposition:
+    """Eigenvalues and eigenvectors of a square matrix
+
+    Symmetric matrices use cyclic Jacobi rotations: the eigenvalues are real and
+    come out in ascending order with orthonormal eigenvectors. Other matrices
+    are reduced to Hessenberg form and then go through shifted QR iteration; the
+    eigenvalues (complex ones included, as `complex`) are sorted by decreasing
+    absolute value and each eigenvector is found by inverse iteration. Repeated
+    eigenvalues get orthogonal vectors spanning their eigenspace; if it's too
+    small (the matrix isn't diagonalizable) `defective` is set and the missing
+    vectors repeat earlier ones, so `V` is singular.
+    `symmetric` is detected when left as `None`. Everything is done in floats.
+    Both paths are O(n^3).
+    """
+
+    n: int
+    symmetric: bool
+    defective: bool
+    values: list
+    _vectors: list[list]
+
+    def __init__(self, matrix: Matrix, symmetric: Optional[bool] = None, vectors: bool = True) -> None:
+        self.n, m = matrix.size
+        assert self.n == m, "Only square matrices have eigenvalues"
+        n = self.n
+        if symmetric == None:
+            rows = matrix.as_list()
+            symmetric = all(rows[i][j] == rows[j][i] for i in range(n) for j in range(i))
+        self.symmetric = symmetric
+        self.defective = False
+
+        if matrix._array is not None:
+            a = matrix._array.astype(np.float64)
+            if symmetric:
+                values, vecs = np.linalg.eigh(a)
+            else:
+                values, vecs = np.linalg.eig(a)
+                order = sorted(range(n), key=lambda i: -abs(values[i]))
+                values, vecs = values[order], vecs[:, order]
+            self.values = [_real_if_close(complex(x), abs(x)) if np.iscomplexobj(values) else float(x) for x in values]
+            self._vectors = vecs.T.tolist()
+            self.defective = not symmetric and n > 0 and np.linalg.matrix_rank(vecs) < n
+            return
+
+        a = [[float(x) for x in row] for row in matrix.rows]
+        if symmetric:
+            values, v = _jacobi_eigen(a)
+            order = sorted(range(n), key=values.__getitem__)
+            self.values = [values[i] for i in order]
+            self._vectors = [[row[i] for row in v] for i in order]
+            return
+
+        h = [[complex(x) for x in row] for row in a]
+        _hessenberg(h)
+        values = _hessenberg_qr_eigenvalues(h)
+        norm = max(sum(abs(x) for x in row) for row in a) if n else 0
+        values = sorted((_real_if_close(x, norm) for x in values), key=lambda x: (-abs(x), -x.real, -x.imag))
+        self.values = values
+        self._vectors = None
+        if vectors:
+            self._vectors = []
+            same = math.sqrt(MACHINE_EPSILON) * (norm or 1)
+            for i, value in enumerate(values):
+                # Vectors already found for this eigenvalue (equal values are next to each other)
+                against = [self._vectors[j] for j in range(i) if abs(values[j] - value) <= same]
+                x, independent = _inverse_iteration(a, value, against=against)
+                if not independent: self.defective = True
+                if not isinstance(value, complex): x = [t.real for t in x]
+                self._vectors.append(x)
+
+    def vectors(self) -> list[Vector]:
+        """The (unit) eigenvectors, in the same order as `values`"""
+        assert self._vectors is not None, "Eigenvectors weren't computed"
+        return [Vector(list(v)) for v in self._vectors]
+
+    def V(self) -> Matrix:
+        """Matrix with the eigenvectors as columns"""
+        return Matrix([list(v) for v in self._vectors]).transpose()
+
+
+class SparseMatrix(Generic[T]):
+    """
+    n x m row-major sparse matrix in compressed sparse row (CSR) form
+
+    The nonzero entries of row `i` are `data[indptr[i]:indptr[i+1]]`, in the
+    (increasing) columns `indices[indptr[i]:indptr[i+1]]`. Zeros are never stored,
+    so memory and the cost of every operation scale with the number of nonzero
+    entries instead of n*m.
+    """
+
+    size: tuple[int, int]
+    indptr: array
+    indices: array
+    data: list[T]
+
+    def __init__(self, size: tuple[int, int], indptr: array, indices: array, data: list[T]) -> None:
+        """Wraps existing CSR arrays as is. See `from_coo` and `from_matrix` for building one"""
+        assert len(indptr) == size[0] + 1, "indptr must have one entry per row plus one"
+        self.size = size
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @staticmethod
+    def from_coo(size: tuple[int, int], rows: list[int], cols: list[int], values: Optional[list[T]] = None) -> SparseMatrix[T]:
+        """Builds a sparse matrix from (row, column, value) triplets
+
+        If `values` is `None` every value is 1. Repeated (row, column) pairs are
+        summed, which is what an adjacency matrix of a multigraph needs.
+        """
+        n, _ = size
+        # Bucket the triplets by row (counting sort) then sort each row by column
+        starts = [0]*(n+1)
+        for r in rows: starts[r+1] += 1
+        for i in range(n): starts[i+1] += starts[i]
+        order = [0]*len(rows)
+        nxt = starts[:-1]
+        for k, r in enumerate(rows):
+            order[nxt[r]] = k
+            nxt[r] += 1
+
+        indptr = array('q', [0])
+        indices = array('q')
+        data = []
+        for i in range(n):
+            row_cols = []
+            row_vals = []
+            for k in sorted(order[starts[i]:starts[i+1]], key=cols.__getitem__):
+                v = 1 if values == None else values[k]
+                if row_cols and row_cols[-1] == cols[k]:
+                    row_vals[-1] += v
+                else:
+                    row_cols.append(cols[k])
+                    row_vals.append(v)
+            for c, v in zip(row_cols, row_vals):
+                if v != 0:
+                    indices.append(c)
+                    data.append(v)
+            indptr.append(len(indices))
+        return SparseMatrix(size, indptr, indices, data)
+
+    @staticmethod
+    def from_matrix(m: Matrix[T]) -> SparseMatrix[T]:
+        indptr = array('q', [0])
+        indices = array('q')
+        data = []
+        for row in m.as_list():
+            for j, v in enumerate(row):
+                if v != 0:
+                    indices.append(j)
+                    data.append(v)
+            indptr.append(len(indices))
+        return SparseMatrix(m.size, indptr, indices, data)
+
+    @staticmethod
+    def identity(n: int) -> SparseMatrix[int]:
+        return SparseMatrix((n, n), array('q', range(n+1)), array('q', range(n)), [1]*n)
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored (nonzero) entries"""
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"SparseMatrix({self.size[0]}x{self.size[1]}, {self.nnz} nonzero)"
+
+    def row(self, i: int) -> dict[int, T]:
+        """Row `i` as {column: value}"""
+        s, e = self.indptr[i], self.indptr[i+1]
+        return dict(zip(self.indices[s:e], self.data[s:e]))
+
+    def __getitem__(self, i: int) -> Vector[T]:
+        res = [0]*self.size[1]
+        for j, v in self.row(i).items(): res[j] = v
+        return Vector(res)
+
+    def as_list(self) -> list[list[T]]:
+        return [list(self[i]) for i in range(self.size[0])]
+
+    def to_matrix(self, backend: Optional[str] = None) -> Matrix[T]:
+        return Matrix(self.as_list(), backend)
+
+    def copy(self) -> SparseMatrix[T]:
+        return SparseMatrix(self.size, array('q', self.indptr), array('q', self.indices), self.data.copy())
+
+    def transpose(self) -> SparseMatrix[T]:
+        """O(nnz) transpose by counting sort on the columns"""
+        n, m = self.size
+        indptr = [0]*(m+1)
+        for c in self.indices: indptr[c+1] += 1
+        for j in range(m): indptr[j+1] += indptr[j]
+
+        indices = array('q', [0])*self.nnz
+        data = [None]*self.nnz
+        nxt = indptr[:-1]
+        for i in range(n):
+            for p in range(self.indptr[i], self.indptr[i+1]):
+                c = self.indices[p]
+                indices[nxt[c]] = i
+                data[nxt[c]] = self.data[p]
+                nxt[c] += 1
+        return SparseMatrix((m, n), array('q', indptr), indices, data)
+
+    def __mul__(self, other: Union[SparseMatrix[T], Matrix[T], Vector[T], T]) -> Union[SparseMatrix[T], Matrix[T], Vector[T]]:
+        n, m = self.size
+        indptr, indices, data = self.indptr, self.indices, self.data
+
+        if isinstance(other, SparseMatrix):
+            # Gustavson's algorithm: row i of the product is the sum of the rows of
+            # `other` picked out by the nonzeros of row i
+            assert m == other.size[0], "Cannot multiply matrices of incompatible sizes"
+            res_indptr = array('q', [0])
+            res_indices = array('q')
+            res_data = []
+            for i in range(n):
+                acc = {}
+                for p in range(indptr[i], indptr[i+1]):
+                    v = data[p]
+                    k = indices[p]
+                    for q in range(other.indptr[k], other.indptr[k+1]):
+                        j = other.indices[q]
+                        acc[j] = acc.get(j, 0) + v*other.data[q]
+                for j in sorted(acc):
+                    if acc[j] != 0:
+                        res_indices.append(j)
+                        res_data.append(acc[j])
+                res_indptr.append(len(res_indices))
+            return SparseMatrix((n, other.size[1]), res_indptr, res_indices, res_data)
+
+        elif isinstance(other, Matrix):
+            assert m == other.size[0], "Cannot multiply matrices of incompatible sizes"
+            b = other.as_list()
+            res = []
+            for i in range(n):
+                res_row = [0]*other.size[1]
+                for p in range(indptr[i], indptr[i+1]):
+                    v = data[p]
+                    res_row = [r + v*x for r, x in zip(res_row, b[indices[p]])]
+                res.append(res_row)
+            return Matrix(res)
+
+        elif isinstance(other, Vector):
+            assert m == len(other), "Cannot multiply matrix with vector of incompatible size"
+            x = list(other)
+            return Vector([
+                sum(data[p]*x[indices[p]] for p in range(indptr[i], indptr[i+1]))
+                for i in range(n)
+            ])
+
+        else:
+            if other == 0: return SparseMatrix(self.size, array('q', [0])*(n+1), array('q'), [])
+            return SparseMatrix(self.size, array('q', indptr), array('q', indices), [v*other for v in data])
+
+    def __rmul__(self, other: Union[Matrix[T], T]) -> Union[Matrix[T], SparseMatrix[T]]:
+        if isinstance(other, Matrix):
+            # Each nonzero (k, j) of `self` adds a[k] * v to column j of every row
+            assert other.size[1] == self.size[0], "Cannot multiply matrices of incompatible sizes"
+            res = []
+            for a_row in other.as_list():
+                res_row = [0]*self.size[1]
+                for k, a in enumerate(a_row):
+                    if a == 0: continue
+                    for p in range(self.indptr[k], self.indptr[k+1]):
+                        res_row[self.indices[p]] += a*self.data[p]
+                res.append(res_row)
+            return Matrix(res)
+        elif isinstance(other, Vector):
+            raise ValueError("Cannot left multiply a vector with a matrix!")
+        return self.__mul__(other)
+
+    def __neg__(self) -> SparseMatrix[T]:
+        return self * -1
+
+
+# Side length of the square tiles `MappedMatrix` streams through memory
+MAPPED_TILE_SIZE = 512
+
+class MappedMatrix:
+    """
+    n x m matrix stored in a binary file and memory-mapped, for matrices bigger
+    than RAM
+
+    The file is a 32 byte header (magic b"LAMX", format version, the `array`
+    typecode "d" for float64 or "q" for int64, rows, columns) followed by the
+    entries in row-major order, in native byte order. Opening a file maps it
+    without reading or copying anything; pages are loaded by the OS as they're
+    touched. `row` returns zero-copy memoryviews into the map.
+
+    `matmul` and `transposed` write their result to a new file and work in
+    `MAPPED_TILE_SIZE` square tiles, so only a few tiles are in memory at once.
+    Multiplying by a `Vector` streams the rows. Use it as a context manager (or
+    call `close`) to release the file; views from `row` must be released first.
+    """
+
+    HEADER = struct.Struct("<4sHcxQQ8x")
+    MAGIC = b"LAMX"
+    VERSION = 1
+    DTYPES = ("d", "q")
+
+    size: tuple[int, int]
+    dtype: str
+    path: str
+
+    def __init__(self, path: str, writable: bool = False) -> None:
+        """Maps the existing file `path`, see `open`"""
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+            magic, version, dtype, n, m = self.HEADER.unpack_from(self._mmap)
+            if magic != self.MAGIC: raise ValueError(f"{path} is not a matrix file")
+            if version != self.VERSION: raise ValueError(f"Unsupported matrix file version {version}")
+            self.dtype = dtype.decode()
+            if self.dtype not in self.DTYPES: raise ValueError(f"Unsupported matrix dtype {self.dtype!r}")
+            self.size = (n, m)
+            itemsize = array(self.dtype).itemsize
+            if len(self._mmap) < self.HEADER.size + n*m*itemsize: raise ValueError(f"{path} is truncated")
+            self._data = memoryview(self._mmap)[self.HEADER.size:self.HEADER.size + n*m*itemsize].cast(self.dtype)
+        except Exception:
+            self._file.close()
+            raise
+
+    @staticmethod
+    def open(path: str, writable: bool = False) -> MappedMatrix:
+        return MappedMatrix(path, writable)
+
+    @staticmethod
+    def create(path: str, size: tuple[int, int], dtype: str = "d") -> MappedMatrix:
+        """Creates (or overwrites) `path` as a zero matrix of `size` and opens it for writing"""
+        assert dtype in MappedMatrix.DTYPES, f"dtype must be one of {MappedMatrix.DTYPES}"
+        n, m = size
+        with open(path, "wb") as f:
+            f.write(MappedMatrix.HEADER.pack(MappedMatrix.MAGIC, MappedMatrix.VERSION, dtype.encode(), n, m))
+            f.truncate(MappedMatrix.HEADER.size + n*m*array(dtype).itemsize)
+        return MappedMatrix(path, writable=True)
+
+    @staticmethod
+    def from_matrix(path: str, matrix: Union[Matrix, SparseMatrix, list[list]], dtype: Optional[str] = None) -> MappedMatrix:
+        """Writes `matrix` to `path` row by row, so it never needs a dense copy in memory
+
+        `dtype` defaults to "q" for all-int matrices, "d" otherwise. For a
+        `SparseMatrix` only the stored entries are looked at and written
+        """
+        if isinstance(matrix, SparseMatrix):
+            if dtype == None:
+                dtype = "q" if _numeric_kind([matrix.data]) == "int" else "d"
+            res = MappedMatrix.create(path, matrix.size, dtype)
+            # The new file is all zeros, so only the nonzero entries are written
+            m = matrix.size[1]
+            for i in range(matrix.size[0]):
+                for p in range(matrix.indptr[i], matrix.indptr[i+1]):
+                    res._data[i*m + matrix.indices[p]] = matrix.data[p]
+            return res
+
+        if isinstance(matrix, Matrix) and matrix._array is not None:
+            rows = matrix._array
+            if dtype == None: dtype = "q" if rows.dtype.kind in "iu" else "d"
+        else:
+            rows = matrix.rows if isinstance(matrix, Matrix) else matrix
+            if dtype == None: dtype = "q" if _numeric_kind(rows) == "int" else "d"
+        res = MappedMatrix.create(path, (len(rows), len(rows[0]) if len(rows) else 0), dtype)
+        for i, row in enumerate(rows):
+            res.set_row(i, row)
+        return res
+
+    def close(self) -> None:
+        if self._file.closed: return
+        self._data.release()
+        self._mmap.close()
+        self._file.close()
+
+    def flush(self) -> None:
+        self._mmap.flush()
+
+    def __enter__(self) -> MappedMatrix:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"MappedMatrix({self.path!r}, size={self.size}, dtype={self.dtype!r})"
+
+    def row(self, i: int) -> memoryview:
+        """Zero-copy view of row `i`"""
+        m = self.size[1]
+        return self._data[i*m:(i+1)*m]
+
+    def __getitem__(self, i: int) -> Vector:
+        """Row `i`. Float rows are `FloatVector`s sharing the file's memory"""
+        if self.dtype == "d": return FloatVector(self.row(i))
+        return Vector(self.row(i).tolist())
+
+    def set_row(self, i: int, values: Any) -> None:
+        self.row(i)[:] = array(self.dtype, values)
+
+    def tile(self, r0: int, r1: int, c0: int, c1: int) -> list[list]:
+        """Copy of the block of rows `r0`:`r1` and columns `c0`:`c1` as lists"""
+        m = self.size[1]
+        return [self._data[i*m+c0:i*m+c1].tolist() for i in range(r0, r1)]
+
+    def as_array(self) -> np.ndarray:
+        """Zero-copy n x m ndarray over the map (needs NumPy)"""
+        assert np_available, "as_array needs NumPy"
+        return np.frombuffer(self._data, dtype=np.float64 if self.dtype == "d" else np.int64).reshape(self.size)
+
+    def as_list(self) -> list[list]:
+        return self.tile(0, self.size[0], 0, self.size[1])
+
+    def to_matrix(self) -> Matrix:
+        return Matrix(self.as_list())
+
+    def transposed(self, path: str, tile: Optional[int] = None) -> MappedMatrix:
+        """Writes the transpose to a new file at `path`, one tile at a time"""
+        tile = tile or MAPPED_TILE_SIZE
+        n, m = self.size
+        res = MappedMatrix.create(path, (m, n), self.dtype)
+        for i0 in range(0, n, tile):
+            i1 = min(i0 + tile, n)
+            for j0 in range(0, m, tile):
+                j1 = min(j0 + tile, m)
+                block = self.tile(i0, i1, j0, j1)
+                for j, col in enumerate(zip(*block), j0):
+                    res._data[j*n+i0:j*n+i1] = array(self.dtype, col)
+        return res
+
+    def matmul(self, other: Union[MappedMatrix, Matrix], path: str, tile: Optional[int] = None) -> MappedMatrix:
+        """
+        Writes self * `other` to a new file at `path`
+
+        Every tile of the result is accumulated from products of a row of tiles of
+        self and a column of tiles of `other`, so memory use is a few tiles however
+        big the matrices are. Tiles are multiplied in NumPy when it's available
+        """
+        tile = tile or MAPPED_TILE_SIZE
+        n, k = self.size
+        k2, m = other.size
+        assert k == k2, "Cannot multiply matrices of incompatible sizes"
+        other_dtype = other.dtype if isinstance(other, MappedMatrix) else ("q" if _numeric_kind(other.rows) == "int" else "d")
+        dtype = "q" if self.dtype == other_dtype == "q" else "d"
+        res = MappedMatrix.create(path, (n, m), dtype)
+
+        if np_available:
+            a = self.as_array()
+            b = other.as_array() if isinstance(other, MappedMatrix) else np.array(other.as_list())
+            c = res.as_array()
+            for i0 in range(0, n, tile):
+                for j0 in range(0, m, tile):
+                    acc = np.zeros((min(tile, n-i0), min(tile, m-j0)), dtype=c.dtype)
+                    for k0 in range(0, k, tile):
+                        acc += a[i0:i0+tile, k0:k0+tile] @ b[k0:k0+tile, j0:j0+tile]
+                    c[i0:i0+tile, j0:j0+tile] = acc
+            del a, b, c
+            return res
+
+        other_rows = None if isinstance(other, MappedMatrix) else other.as_list()
+        for i0 in range(0, n, tile):
+            i1 = min(i0 + tile, n)
+            for j0 in range(0, m, tile):
+                j1 = min(j0 + tile, m)
+                acc = None
+                for k0 in range(0, k, tile):
+                    k1 = min(k0 + tile, k)
+                    b = other.tile(k0, k1, j0, j1) if other_rows is None else [row[j0:j1] for row in other_rows[k0:k1]]
+                    product = _matmul_blocked(self.tile(i0, i1, k0, k1), b)
+                    acc = product if acc is None else _madd(acc, product)
+                for i, row in enumerate(acc, i0):
+                    res._data[i*m+j0:i*m+j1] = array(dtype, row)
+        return res
+
+    def __mul__(self, other: Vector) -> Vector:
+        """Matrix-vector product, streaming one row at a time"""
+        if not isinstance(other, Vector): return NotImplemented
+        n, m = self.size
+        assert m == len(other), "Cannot multiply matrix with vector of incompatible size"
+        x = list(other)
+        return Vector([sum(map(operator.mul, self.row(i), x)) for i in range(n)])
+
+
+def _matvec(a: Union[Matrix, SparseMatrix, MappedMatrix]) -> Callable[[list[float]], list[float]]:
+    """Returns x -> a x on float lists for a `Matrix`, `SparseMatrix` or `MappedMatrix`"""
+    if isinstance(a, MappedMatrix):
+        return lambda x: [sum(map(operator.mul, a.row(i), x)) for i in range(a.size[0])]
+    if isinstance(a, SparseMatrix):
+        rows = [(a.indices[a.indptr[i]:a.indptr[i+1]].tolist(), a.data[a.indptr[i]:a.indptr[i+1]])
+                for i in range(a.size[0])]
+        return lambda x: [sum(map(operator.mul, data, map(x.__getitem__, cols))) for cols, data in rows]
+    if a._array is not None:
+        array = a._array.astype(np.float64)
+        return lambda x: (array @ np.array(x)).tolist()
+    rows = a.rows
+    return lambda x: [sum(map(operator.mul, row, x)) for row in rows]
+
+def _orthonormalize(vectors: list[list[float]]) -> list[list[float]]:
+    """Modified Gram-Schmidt on float lists, dropping dependent vectors"""
+    res = []
+    for v in vectors:
+        v = list(v)
+        for q in res:
+            s = sum(map(operator.mul, v, q))
+            v = [x - s*y for x, y in zip(v, q)]
+        norm = math.sqrt(sum(map(operator.mul, v, v)))
+        if norm > MACHINE_EPSILON * 1024: res.append([x / norm for x in v])
+    return res
+
+def _top_k(values: list[float], vectors: list[list[float]], k: int) -> tuple[list[float], list[Vector]]:
+    order = sorted(range(len(values)), key=lambda i: -abs(values[i]))[:k]
+    return [values[i] for i in order], [Vector(vectors[i]) for i in order]
+
+def power_iteration(a: Union[Matrix, SparseMatrix], k: int = 1, tol: float = 1e-10, max_iter: int = 1000,
+                    seed: int = 0) -> tuple[list[float], list[Vector]]:
+    """
+    The `k` eigenvalues of the symmetric matrix `a` with the largest absolute value,
+    and their unit eigenvectors, by (block) power iteration
+
+    Keeps k orthonormal vectors, multiplies them by `a` and re-orthonormalizes them
+    every step; the eigenpairs are read off with a small k x k Rayleigh-Ritz
+    problem. Only needs products with `a`, so a large `SparseMatrix` (like a
+    graph's adjacency matrix) costs O(k nnz) per step. Converges at the rate
+    |lambda_k+1 / lambda_k|, see `lanczos` for something faster.
+    """
+    n = a.size[0]
+    k = min(k, n)
+    matvec = _matvec(a)
+    rng = random.Random(seed)
+    q = _orthonormalize([[rng.random() - 0.5 for _ in range(n)] for _ in range(k)])
+    values = None
+    for _ in range(max_iter):
+        aq = [matvec(v) for v in q]
+        # Rayleigh-Ritz: eigen-decompose q^T a q and rotate q to match
+        small = [[sum(map(operator.mul, u, w)) for w in aq] for u in q]
+        small = [[(small[i][j] + small[j][i]) / 2 for j in range(len(q))] for i in range(len(q))]
+        new_values, s = _jacobi_eigen(small)
+        ritz = [[sum(s[j][i] * q[j][t] for j in range(len(q))) for t in range(n)] for i in range(len(q))]
+        if values != None and max(abs(x-y) for x, y in zip(sorted(new_values), sorted(values))) <= tol * max(map(abs, new_values), default=1):
+            return _top_k(new_values, ritz, k)
+        values = new_values
+        q = _orthonormalize([[sum(s[j][i] * aq[j][t] for j in range(len(q))) for t in range(n)] for i in range(len(q))])
+        if len(q) < len(values):
+            # a q lost rank (a has fewer than k nonzero eigenvalues), refill with random vectors
+            q = _orthonormalize(q + [[rng.random() - 0.5 for _ in range(n)] for _ in range(len(values) - len(q))])
+    return _top_k(values, ritz, k)
+
+def lanczos(a: Union[Matrix, SparseMatrix], k: int = 1, steps: Optional[int] = None,
+            seed: int = 0, tol: float = 1e-10, max_steps: Optional[int] = None) -> tuple[list[float], list[Vector]]:
+    """
+    The `k` eigenvalues of the symmetric matrix `a` with the largest absolute value,
+    and their unit eigenvectors, by the Lanczos iteration
+
+    Builds an orthonormal basis of the Krylov space span(q, a q, a^2 q, ...), in
+    which `a` is tridiagonal, and takes the extreme eigenpairs of that small
+    matrix. After `steps` vectors (default 2k + 20) and then every time the basis
+    has grown by half, the residual |a y - theta y| = beta |s_m| of each Ritz pair
+    is checked; it stops once they're all below `tol` times the largest |theta|,
+    and raises a `ValueError` if that didn't happen within `max_steps` (default n,
+    where the space is the whole of R^n). If the space becomes invariant with
+    fewer than `k` vectors (repeated eigenvalues) it restarts from a new random
+    vector orthogonal to it. Vectors are fully reorthogonalized to
+    keep the basis orthogonal in floating point. Like `power_iteration` it only
+    needs products with `a`, but converges much faster.
+    """
+    n = a.size[0]
+    k = min(k, n)
+    max_steps = n if max_steps == None else min(n, max_steps)
+    check = min(max_steps, steps if steps != None else 2*k + 20)
+    matvec = _matvec(a)
+    rng = random.Random(seed)
+    q = _orthonormalize([[rng.random() - 0.5 for _ in range(n)]])
+    alphas = []
+    betas = []
+    while True:
+        w = matvec(q[-1])
+        alpha = sum(map(operator.mul, w, q[-1]))
+        alphas.append(alpha)
+        for v in q:
+            s = sum(map(operator.mul, w, v))
+            w = [x - s*y for x, y in zip(w, v)]
+        beta = math.sqrt(sum(map(operator.mul, w, w)))
+        m = len(alphas)
+        # The Krylov space is invariant, so the Ritz pairs are exact
+        invariant = beta <= MACHINE_EPSILON * 1024 * (abs(alpha) or 1)
+        if invariant and m < k:
+            # Too few pairs in it (repeated eigenvalues): continue from a random
+            # vector orthogonal to the basis, T gets a 0 off the diagonal there
+            w = [rng.random() - 0.5 for _ in range(n)]
+            for _ in range(2):
+                for v in q:
+                    s = sum(map(operator.mul, w, v))
+                    w = [x - s*y for x, y in zip(w, v)]
+            betas.append(0.0)
+            norm = math.sqrt(sum(map(operator.mul, w, w)))
+            q.append([x / norm for x in w])
+            continue
+        if invariant or m >= check:
+            t = [[0.0]*m for _ in range(m)]
+            for i in range(m):
+                t[i][i] = alphas[i]
+                if i+1 < m: t[i][i+1] = t[i+1][i] = betas[i]
+            if np_available:
+                values, s = (x.tolist() for x in np.linalg.eigh(np.array(t)))
+            else:
+                values, s = _jacobi_eigen(t)
+            top = sorted(range(m), key=lambda i: -abs(values[i]))[:k]
+            scale = max(map(abs, values)) or 1
+            if invariant or m == n or all(beta * abs(s[m-1][i]) <= tol * scale for i in top):
+                break
+            if m >= max_steps:
+                raise ValueError(f"Lanczos didn't converge in {m} steps")
+            check = min(max_steps, m + max(10, m // 2))
+        betas.append(beta)
+        q.append([x / beta for x in w])
+
+    vectors = []
+    for i in top:
+        v = [0.0]*n
+        for j in range(m):
+            if s[j][i] != 0: v = [x + s[j][i]*y for x, y in zip(v, q[j])]
+        vectors.append(Vector(v))
+    return [values[i] for i in top], vectors
+
 
 # Aliases for shorter code
 Vec = Vector
@@ -327,42 +2376,75 @@ Mat = Matrix
 """
 Why spend a couple minutes doing parsing by hand when you can spend hours
 making and debugging a program to parse it???
-Apparently sometimes the equation ('-' in '-') where both characters are dashes
-returns False.
 """
-def standard_translation_matrix(variables, transformation):
-    variables = variables.replace(" ", "")
-    transformation = transformation.replace(" ", "")
-    # replace minus (−) and dash (-) with 'm' because sometimes '-' in '-' returns False (wtf python???)
-    transformation = transformation.replace("−", "m")
-    transformation = transformation.replace("-", "m")
-    variables = variables.split(",")
+# Both the dash and the unicode minus (−) count as minus signs
+_STM_TOKEN = r"\s*(?:(?P<sign>[-+−–])|(?P<number>\d+(?:\.\d*)?|\.\d+)|(?P<star>\*)|(?P<var>{variables})|(?P<comma>,)|(?P<error>\S))"
+
+@functools.lru_cache(maxsize=64)
+def _stm_tokenizer(variables):
+    """Compiled tokenizer for the variable names in the tuple `variables`"""
+    # Longest names first so "x1" isn't read as "x" followed by "1"
+    names = "|".join(re.escape(v) for v in sorted(variables, key=len, reverse=True))
+    return re.compile(_STM_TOKEN.format(variables=names))
+
+def _parse_number(text):
+    return float(text) if "." in text else int(text)
+
+@functools.lru_cache(maxsize=4096)
+def _parse_transformation(variables, transformation):
+    """
+    Coefficient rows (as tuples) of a comma separated list of linear equations
+
+    Every term is an optional sign, an optional number (int or decimal), an
+    optional '*' and a variable. A missing number means a coefficient of 1 (or -1).
+    Every term but the first of an equation needs a sign. Repeated variables in
+    one equation are added together.
+    """
+    variables = tuple(v.strip() for v in variables.split(","))
+    if "" in variables: raise ValueError(f"Empty variable name in {','.join(variables)!r}")
+    index = {v: i for i, v in enumerate(variables)}
     rows = []
-    equations = transformation.split(",")
-    # print("variables", variables)
-    # print("equations:", equations)
-    for eq in equations:
-        # print("equation:", eq)
-        current_eq = [0 for _ in range(len(variables))]
-        current_n = ""
-        for char in eq:
-            # print("char:", char, "current_n:", current_n, end=" ")
-            for var_index in range(len(variables)):
-                if char == variables[var_index]:
-                    # print("char in variables", end=" ")
-                    current_n = current_n.replace("m", "-") # replace m back into a dash(-)
-                    if len(current_n) > 0:
-                        current_eq[var_index] = int(current_n)
-
-            if char in "m0123456789":
-                # print("char in list", end=" ")
-                current_n += char
-            else:
-                current_n = ""
-        #     print()
-        # print("adding current_eq:", current_eq)
-        rows.append(current_eq)
-    return Mat(rows)
+    row = [0] * len(variables)
+    sign, coefficient = 1, None
+    after_term = False # A term just ended, so only a sign or a comma can come next
+    for match in _stm_tokenizer(variables).finditer(transformation):
+        kind = match.lastgroup
+        if after_term and kind in ("number", "star", "var"):
+            raise ValueError(f"Missing sign before {match.group(kind)!r} in {transformation!r}")
+        after_term = kind == "var"
+        if kind == "sign":
+            if coefficient != None: raise ValueError(f"Constant term {coefficient} in {transformation!r}")
+            if match.group("sign") != "+": sign = -sign
+        elif kind == "number":
+            if coefficient != None: raise ValueError(f"Two numbers in a row in {transformation!r}")
+            coefficient = _parse_number(match.group("number"))
+        elif kind == "star":
+            if coefficient == None: raise ValueError(f"'*' without a coefficient in {transformation!r}")
+        elif kind == "var":
+            row[index[match.group("var")]] += sign * (1 if coefficient == None else coefficient)
+            sign, coefficient = 1, None
+        elif kind == "comma":
+            if coefficient != None: raise ValueError(f"Constant term {coefficient} in {transformation!r}")
+            rows.append(tuple(row))
+            row = [0] * len(variables)
+            sign = 1
+        else:
+            raise ValueError(f"Unexpected {match.group('error')!r} in {transformation!r}")
+    if coefficient != None: raise ValueError(f"Constant term {coefficient} in {transformation!r}")
+    rows.append(tuple(row))
+    return tuple(rows)
+
+def standard_translation_matrix(variables, transformation):
+    """
+    Matrix of a linear transformation written out as equations, like
+    stm("x, y", "2x - 3y, y + .5x"). Parsed transformations are cached, so
+    generating the same one again only copies the rows
+    """
+    return Mat([list(row) for row in _parse_transformation(variables, transformation)])
+
+def standard_translation_matrices(variables, transformations):
+    """`standard_translation_matrix` for each of `transformations` (over the same variables)"""
+    return [standard_translation_matrix(variables, t) for t in transformations]
 
 stm = standard_translation_matrix
 
@@ -371,6 +2453,9 @@ def interpolating_polynomial(points, degree=-1):
     """
     Generate a matrix for an interpolating polynomial from point pairs
     By default, degree will be the number of points
+
+    Solving this Vandermonde system is O(n^3) and badly conditioned, to actually
+    interpolate use `NewtonInterpolation` or `BarycentricInterpolation`
     """
     if degree == -1:
         degree = len(points)
@@ -378,21 +2463,226 @@ def interpolating_polynomial(points, degree=-1):
     vectors = []
     for point in points:
         poly = []
+        power = 1
         for n in range(degree):
-            poly.append(pow(point[0], n))
+            poly.append(power)
+            power *= point[0]
         poly.append(point[1])
         vectors.append(Vec(poly))
 
     return Mat(vectors)
 
+
+class _Interpolation(ABC):
+    """Shared point storage and vectorized calling for the interpolation classes
+
+    Subclasses update their coefficients in `_add_point` and implement
+    `_evaluate` and `power_coefficients`
+    """
+
+    xs: list
+    ys: list
+
+    def __init__(self, points=()) -> None:
+        self.xs = []
+        self.ys = []
+        self.add_points(points)
+
+    def add_points(self, points) -> None:
+        for x, y in points:
+            self.add_point(x, y)
+
+    def add_point(self, x, y) -> None:
+        if x in self.xs: raise ValueError(f"Interpolation points need distinct x values ({x} is repeated)")
+        self._add_point(x, y)
+        self.xs.append(x)
+        self.ys.append(y)
+
+    @abstractmethod
+    def _add_point(self, x, y) -> None:
+        """Updates the coefficients for a new point, before it's appended to `xs` and `ys`"""
+
+    @abstractmethod
+    def _evaluate(self, x):
+        """Value of the interpolating polynomial at the number `x`"""
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __call__(self, x):
+        """
+        Value of the interpolating polynomial at `x`. `x` can also be a NumPy array
+        (evaluated in one vectorized pass) or a list (converted to an array if
+        NumPy is available, evaluated point by point otherwise)
+        """
+        assert self.xs, "Can't interpolate without any points"
+        if isinstance(x, (list, tuple)):
+            if not np_available: return [self._evaluate(v) for v in x]
+            x = np.asarray(x)
+        if _is_array(x): return self._evaluate_array(x)
+        return self._evaluate(x)
+
+    def _evaluate_array(self, x):
+        return self._evaluate(x)
+
+    def to_polynomial(self, variable: str = "x") -> Equation:
+        """Expands the interpolating polynomial into an `Equation` in `variable`. O(n^2)"""
+        res = Polynomial()
+        for c, power in zip(self.power_coefficients(), range(len(self))):
+            res.add_scaled(Polynomial.coerce(c) * Polynomial.variable(variable, power) if power else c)
+        return Equation.from_polynomial(res)
+
+    @abstractmethod
+    def power_coefficients(self) -> list:
+        """Coefficients of the interpolating polynomial, constant term first"""
+
+
+class NewtonInterpolation(_Interpolation):
+    """
+    Interpolating polynomial in Newton form, from divided differences
+
+        p(x) = c0 + c1 (x-x0) + c2 (x-x0)(x-x1) + ...
+
+    Only the last row of the divided difference table is kept, so `add_point`
+    costs O(n) (O(n^2) for all the points) and earlier coefficients never change.
+    Evaluating is O(n) per point with a Horner-like scheme.
+    Ints are interpolated in floats, `Fraction`s stay exact.
+    """
+
+    coefficients: list
+
+    def __init__(self, points=()) -> None:
+        self.coefficients = []
+        self._diagonal = []
+        super().__init__(points)
+
+    def _add_point(self, x, y) -> None:
+        # The new diagonal is f[x_n], f[x_n-1, x_n], ..., f[x_0, ..., x_n]
+        n = len(self.xs)
+        diagonal = [y]
+        for k in range(n):
+            diagonal.append((diagonal[k] - self._diagonal[k]) / (x - self.xs[n-1-k]))
+        self._diagonal = diagonal
+        self.coefficients.append(diagonal[-1])
+
+    def _evaluate(self, x):
+        n = len(self.coefficients)
+        res = self.coefficients[-1]
+        for k in range(n-2, -1, -1):
+            res = res * (x - self.xs[k]) + self.coefficients[k]
+        return res
+
+    def power_coefficients(self) -> list:
+        # Horner's scheme again, on coefficient lists
+        res = [self.coefficients[-1]]
+        for k in range(len(self.coefficients)-2, -1, -1):
+            shifted = [0] + res
+            for i, c in enumerate(res):
+                shifted[i] -= self.xs[k] * c
+            shifted[0] += self.coefficients[k]
+            res = shifted
+        return res
+
+
+class BarycentricInterpolation(_Interpolation):
+    """
+    Interpolating polynomial in (second) barycentric Lagrange form
+
+        p(x) = sum(w_j y_j / (x-x_j)) / sum(w_j / (x-x_j)),   w_j = 1 / prod(x_j-x_k, k != j)
+
+    The weights only depend on the x values, so `ys` can be changed freely (for
+    example to interpolate other data on the same nodes) without recomputing them.
+    `add_point` updates the weights in O(n) and evaluating is O(n) per point.
+    Numerically stable for any nodes, and very good on Chebyshev nodes.
+    """
+
+    weights: list
+
+    def __init__(self, points=()) -> None:
+        self.weights = []
+        super().__init__(points)
+
+    def _add_point(self, x, y) -> None:
+        w = 1
+        for i, xi in enumerate(self.xs):
+            self.weights[i] /= (xi - x)
+            w *= (x - xi)
+        self.weights.append(1 / w if self.xs else 1)
+
+    def _evaluate(self, x):
+        num = den = 0
+        for xj, yj, wj in zip(self.xs, self.ys, self.weights):
+            d = x - xj
+            if d == 0: return yj
+            t = wj / d
+            num += t * yj
+            den += t
+        return num / den
+
+    def _evaluate_array(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        xs = np.asarray(self.xs, dtype=np.float64)
+        ys = np.asarray(self.ys, dtype=np.float64)
+        w = np.asarray(self.weights, dtype=np.float64)
+
+        flat = x.reshape(-1)
+        res = np.empty_like(flat)
+        # In chunks so the (points x nodes) table stays around a million entries
+        step = max(1, (1 << 20) // len(xs))
+        for start in range(0, len(flat), step):
+            d = flat[start:start+step, None] - xs
+            exact = d == 0
+            d[exact] = 1  # Replaced below, avoids dividing by zero
+            t = w / d
+            chunk = (t @ ys) / t.sum(axis=1)
+            hit = exact.any(axis=1)
+            chunk[hit] = ys[exact.argmax(axis=1)[hit]]
+            res[start:start+step] = chunk
+        return res.reshape(x.shape)
+
+    def power_coefficients(self) -> list:
+        # p = sum(y_j w_j l(x) / (x-x_j)) with l(x) = prod(x-x_k)
+        n = len(self.xs)
+        full = [1]
+        for xk in self.xs:
+            full = [0] + full
+            for i in range(len(full)-1):
+                full[i] -= xk * full[i+1]
+
+        res = [0] * n
+        for xj, yj, wj in zip(self.xs, self.ys, self.weights):
+            # Synthetic division of l(x) by (x - xj)
+            q = [0] * n
+            carry = 0
+            for i in range(n, 0, -1):
+                carry = full[i] + carry * xj
+                q[i-1] = carry
+            for i in range(n):
+                res[i] += wj * yj * q[i]
+        return res
+
 def orthogonalize(basis):
+    """
+    Returns an orthogonal (not normalized) basis spanning the same space as `basis`
+
+    Uses modified Gram-Schmidt: each projection is taken from the partially
+    orthogonalized vector instead of the original, which keeps the result
+    orthogonal for ill-conditioned bases. The squared norms of the finished
+    vectors are only computed once. Vectors that are linearly dependent on the
+    ones before them come out as zero vectors.
+    For an orthonormal basis along with R, see `Matrix.qr`
+    """
     ortho_basis = []
-    for i in range(len(basis)):
-        ortho_vector = basis[i]
-        for j in range(len(ortho_basis)):
-            ortho_vector -= basis[i].ortho_proj(ortho_basis[j])
-        ortho_basis.append(ortho_vector)
-    return ortho_basis
+    sq_norms = []
+    for vec in basis:
+        v = list(vec)
+        for u, sq_norm in zip(ortho_basis, sq_norms):
+            if sq_norm == 0: continue
+            s = sum(map(operator.mul, v, u)) / sq_norm
+            if s != 0: v = [a - s*b for a, b in zip(v, u)]
+        ortho_basis.append(v)
+        sq_norms.append(sum(map(operator.mul, v, v)))
+    return [Vector(v) for v in ortho_basis]
 
 
 class Variable:
@@ -406,11 +2696,9 @@ class Variable:
 
     def __add__(self, other):
         if isinstance(other, Variable):
-            if other.name == self.name:
-                if other.power == self.power:
-                    return Variable(self.name, coefficient=self.coefficient+other.coefficient, power=self.power)
-                else:
-                    return Equation([self, other])
+            if other.name == self.name and other.power == self.power:
+                return Variable(self.name, coefficient=self.coefficient+other.coefficient, power=self.power)
+            return Equation([self, other])
 
         elif isinstance(other, Term):
             return other.__add__(self)
@@ -454,47 +2742,403 @@ class Variable:
     def copy(self):
         return Variable(self.name, coefficient=self.coefficient, power=self.power)
 
+    def to_polynomial(self):
+        return Polynomial({_monomial([self]): self.coefficient} if self.coefficient != 0 else {})
+
 Var = Variable
 
+
+# Every monomial is hash-consed through this table so equal monomials are the same
+# tuple; dict lookups then usually stop at the identity check
+_monomials = {}
+
+def _intern_monomial(powers):
+    m = tuple(sorted((n, p) for n, p in powers.items() if p != 0))
+    return _monomials.setdefault(m, m)
+
+@functools.lru_cache(maxsize=1<<16)
+def _monomial_mul(a, b):
+    """Product of two monomials (sorted tuples of (name, power) pairs)"""
+    if not a: return b
+    if not b: return a
+    powers = dict(a)
+    for name, power in b:
+        powers[name] = powers.get(name, 0) + power
+    return _intern_monomial(powers)
+
+def _monomial_div(a, b):
+    """a / b for monomials, or `None` if b doesn't divide a"""
+    powers = dict(a)
+    for name, power in b:
+        p = powers.get(name, 0) - power
+        if p < 0: return None
+        powers[name] = p
+    return _intern_monomial(powers)
+
+def _exact_scalar_div(a, b):
+    """a / b that stays an int when ints divide evenly and becomes a `Fraction` when they don't"""
+    if isinstance(a, int) and isinstance(b, int):
+        return a // b if a % b == 0 else Fraction(a, b)
+    return a / b
+
+def _monomial(variables):
+    """The monomial of a list of `Variable`s. Their coefficients are ignored"""
+    powers = {}
+    for v in variables:
+        powers[v.name] = powers.get(v.name, 0) + v.power
+    return _intern_monomial(powers)
+
+def _sum(values):
+    """
+    `sum` for symbolic values. The total is a private `Polynomial` grown with
+    `add_scaled` instead of a new `Equation` per step, so it's linear instead of
+    quadratic. Returns a `Polynomial` if the symbolic values were `Polynomial`s, an
+    `Equation` otherwise, and a plain number if there were no symbolic values
+    """
+    total = Polynomial()
+    numbers = 0
+    kind = None
+    for v in values:
+        if isinstance(v, (Polynomial, Variable, Term, Equation)):
+            if kind == None: kind = Polynomial if isinstance(v, Polynomial) else Equation
+            total.add_scaled(v)
+        else:
+            numbers += v
+    if kind == None: return numbers
+    total.add_scaled(numbers)
+    return total if kind is Polynomial else Equation.from_polynomial(total)
+
+
+class Polynomial:
+    """
+    Sparse multivariate polynomial stored as {monomial: coefficient}
+
+    A monomial is a tuple of (variable name, power) pairs sorted by name, so every
+    product of variables has exactly one key and () is the constant term. Zero
+    coefficients are never stored. Adding is a dict merge and multiplying is a
+    merge of every pair of terms. `Term` and `Equation` are thin wrappers around this.
+
+    `copy` is copy-on-write: both copies share the dict until one of them is
+    changed in place with `add_scaled`. Only use that on polynomials nothing else
+    can see (accumulators like `_sum`); `+=` and `-=` make a new polynomial.
+    """
+
+    __slots__ = ("coefficients", "_shared")
+
+    def __init__(self, coefficients=None):
+        self.coefficients = coefficients if coefficients != None else {}
+        self._shared = False
+
+    @staticmethod
+    def constant(c):
+        return Polynomial({(): c} if c != 0 else {})
+
+    @staticmethod
+    def variable(name, power=1):
+        return Polynomial({_intern_monomial({name: power}): 1})
+
+    @staticmethod
+    def coerce(other):
+        """Converts numbers, `Variable`s, `Term`s and `Equation`s into a `Polynomial`"""
+        if isinstance(other, Polynomial): return other
+        if isinstance(other, (Variable, Term, Equation)): return other.to_polynomial()
+        return Polynomial.constant(other)
+
+    def is_zero(self):
+        return not self.coefficients
+
+    def is_constant(self):
+        return not self.coefficients or (len(self.coefficients) == 1 and () in self.coefficients)
+
+    def constant_term(self):
+        return self.coefficients.get((), 0)
+
+    def to_expression(self):
+        """The constant itself if there are no variables, otherwise an `Equation`"""
+        if self.is_constant(): return self.constant_term()
+        return Equation.from_polynomial(self)
+
+    def exact_div(self, divisor):
+        """Returns self / `divisor` when it divides exactly (raises `ValueError` otherwise)
+
+        Multivariate division by repeatedly cancelling the leading term in lex order
+        """
+        divisor = Polynomial.coerce(divisor)
+        if divisor.is_zero(): raise ZeroDivisionError("Polynomial division by zero")
+        if divisor.is_constant():
+            c = divisor.constant_term()
+            return Polynomial({m: _exact_scalar_div(v, c) for m, v in self.coefficients.items()})
+
+        names = sorted({n for m in self.coefficients for n, _ in m} | {n for m in divisor.coefficients for n, _ in m})
+        def lex_key(m):
+            powers = dict(m)
+            return tuple(powers.get(n, 0) for n in names)
+
+        lead_m = max(divisor.coefficients, key=lex_key)
+        lead_c = divisor.coefficients[lead_m]
+        remainder = self.coefficients.copy()
+        # Max-heap of the remainder's monomials. Cancelled ones are skipped when popped
+        heap = [(tuple(-p for p in lex_key(m)), m) for m in remainder]
+        heapq.heapify(heap)
+        quotient = {}
+        while heap:
+            m = heapq.heappop(heap)[1]
+            if m not in remainder: continue
+            q_m = _monomial_div(m, lead_m)
+            if q_m == None: raise ValueError("Polynomial doesn't divide exactly")
+            q_c = _exact_scalar_div(remainder[m], lead_c)
+            quotient[q_m] = q_c
+            for d_m, d_c in divisor.coefficients.items():
+                r_m = _monomial_mul(q_m, d_m)
+                if r_m not in remainder:
+                    heapq.heappush(heap, (tuple(-p for p in lex_key(r_m)), r_m))
+                c = remainder.get(r_m, 0) - q_c*d_c
+                if c != 0: remainder[r_m] = c
+                else: remainder.pop(r_m, None)
+        return Polynomial(quotient)
+
+    def copy(self):
+        self._shared = True
+        res = Polynomial(self.coefficients)
+        res._shared = True
+        return res
+
+    def compile(self, variables=None):
+        """Returns a `CompiledPolynomial` that evaluates this polynomial in Horner form
+
+        `variables` is the order of the positional arguments (default: the
+        variable names sorted). See `CompiledPolynomial`
+        """
+        return CompiledPolynomial(self, variables)
+
+    def _own(self):
+        """Makes sure `coefficients` isn't shared before changing it in place"""
+        if self._shared:
+            self.coefficients = self.coefficients.copy()
+            self._shared = False
+
+    def add_scaled(self, other, scale=1):
+        """self += scale * other, in place and without building scale * other"""
+        other = Polynomial.coerce(other)
+        if other is self: other = other.copy()
+        self._own()
+        res = self.coefficients
+        for m, c in other.coefficients.items():
+            c = res.get(m, 0) + scale*c
+            if c != 0: res[m] = c
+            else: res.pop(m, None)
+        return self
+
+    def __neg__(self):
+        return Polynomial({m: -c for m, c in self.coefficients.items()})
+
+    def __add__(self, other):
+        if isinstance(other, (Vector, Matrix)): return NotImplemented
+        return Polynomial(self.coefficients.copy()).add_scaled(other)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        return self.__add__(-Polynomial.coerce(other))
+
+    def __rsub__(self, other):
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, (Vector, Matrix)): return NotImplemented
+        other = Polynomial.coerce(other)
+        res = {}
+        for m1, c1 in self.coefficients.items():
+            for m2, c2 in other.coefficients.items():
+                m = _monomial_mul(m1, m2)
+                res[m] = res.get(m, 0) + c1*c2
+        return Polynomial({m: c for m, c in res.items() if c != 0})
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __pow__(self, n):
+        assert n >= 0, "Polynomials can only be raised to non-negative integer powers"
+        res = Polynomial.constant(1)
+        base = self
+        while n:
+            if n & 1: res = res * base
+            n >>= 1
+            if n: base = base * base
+        return res
+
+    def __eq__(self, other):
+        if isinstance(other, (Polynomial, Variable, Term, Equation, int, float, Fraction)):
+            return self.coefficients == Polynomial.coerce(other).coefficients
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(frozenset(self.coefficients.items()))
+
+    def __str__(self):
+        return str(Equation.from_polynomial(self))
+
+    def __repr__(self):
+        return f"Polynomial({self.coefficients})"
+
+
+def _horner_source(coefficients, args, constants):
+    """Python source for the polynomial {monomial: coefficient} in nested Horner form
+
+    Factors out the powers of the first variable in `args` ((name, argument name)
+    pairs), then recurses on the coefficient of every power with the rest.
+    Coefficients are stored in `constants` and referred to by name so that any
+    number type (`Fraction`s, complex...) evaluates exactly as it is
+    """
+    if not args:
+        c = coefficients.get((), 0)
+        if c == 1 and type(c) == int: return "1"
+        constants.append(c)
+        return f"c{len(constants)-1}"
+
+    (name, arg), rest = args[0], args[1:]
+    groups = {}
+    for m, c in coefficients.items():
+        power = dict(m).get(name, 0)
+        groups.setdefault(power, {})[tuple(v for v in m if v[0] != name)] = c
+    if list(groups) == [0]:
+        return _horner_source(groups[0], rest, constants)
+
+    def power_of(p):
+        return arg if p == 1 else f"{arg}**{p}"
+
+    def times(res, p):
+        return power_of(p) if res == "1" else f"({res})*{power_of(p)}"
+
+    powers = sorted(groups, reverse=True)
+    res = _horner_source(groups[powers[0]], rest, constants)
+    for prev, p in zip(powers, powers[1:]):
+        res = f"{times(res, prev-p)} + {_horner_source(groups[p], rest, constants)}"
+    if powers[-1] > 0:
+        res = times(res, powers[-1])
+    return res
+
+class CompiledPolynomial:
+    """
+    A polynomial flattened into a single Python expression in Horner form
+
+    Built once by `Polynomial.compile`/`Equation.compile`; calling it costs one
+    multiply and one add per term instead of walking the terms. The values can be
+    numbers or NumPy arrays, in which case the whole batch of points is evaluated
+    in one vectorized expression. Lists are converted to arrays if NumPy is
+    available and evaluated point by point otherwise.
+
+        f = (x*x*y + 3*y + 1).compile()   # f.variables == ["x", "y"]
+        f(2, 5) == f(x=2, y=5) == 36
+        f(np.linspace(0, 1, 10**6), 2.0)  # array of 10**6 values
+
+    A polynomial that doesn't depend on any variable returns its constant
+    """
+
+    def __init__(self, polynomial, variables=None):
+        polynomial = Polynomial.coerce(polynomial)
+        names = sorted({n for m in polynomial.coefficients for n, _ in m})
+        if variables == None:
+            variables = names
+        else:
+            variables = list(variables)
+            missing = set(names) - set(variables)
+            assert not missing, f"No value order given for variables {sorted(missing)}"
+        self.variables = variables
+
+        # Variable names aren't always identifiers, so the arguments are x0, x1...
+        args = [(name, f"x{i}") for i, name in enumerate(variables)]
+        constants = []
+        body = _horner_source(polynomial.coefficients, [a for a in args if a[0] in names], constants)
+        self.source = f"lambda {', '.join(a for _, a in args)}: {body}"
+        namespace = {f"c{i}": c for i, c in enumerate(constants)}
+        self._f = eval(compile(self.source, "<CompiledPolynomial>", "eval"), namespace)
+
+    def __call__(self, *args, **kwargs):
+        if kwargs:
+            assert not args, "Give the values either positionally or by name, not both"
+            args = [kwargs[name] for name in self.variables]
+        assert len(args) == len(self.variables), f"Expected values for {self.variables}"
+
+        if any(isinstance(a, (list, tuple)) for a in args):
+            if np_available:
+                args = [np.asarray(a) if isinstance(a, (list, tuple)) else a for a in args]
+            else:
+                n = max(len(a) for a in args if isinstance(a, (list, tuple)))
+                columns = [a if isinstance(a, (list, tuple)) else [a]*n for a in args]
+                return [self._f(*point) for point in zip(*columns)]
+        return self._f(*args)
+
+    def __repr__(self):
+        return f"CompiledPolynomial({self.source})"
+
+
 class Term:
+    """
+    A coefficient times a product of variables. This is a single-term `Polynomial`
+
+    `monomial` is the canonical (sorted, hash-consed) form of the variables, so two
+    terms are compatible (can be added together) exactly when their monomials are
+    equal. Terms are never changed in place, so they can be shared freely instead
+    of copied.
+    """
+
+    __slots__ = ("monomial", "coefficient")
+
     def __init__(self, variables, coefficient=1):
         """
         Creates a term where variables are multiplied together
         The variable coefficients will be combined into a single Term coefficient
 
-        variables should be a list. WARNING: It will be shallow copied
-        comparing variables == other.variables should tell you if the two terms are compatible (can be added together)
+        variables should be a list of `Variable`s (or a single `Variable`). They aren't modified
         """
 
-        if "__len__" in dir(variables.__class__):
-            self.variables = variables
-        else: # So you can create a Term from a single variable more easily
-            self.variables = [variables]
+        if "__len__" not in dir(variables.__class__): # So you can create a Term from a single variable more easily
+            variables = [variables]
 
         # Move all the variable's coefficients into the term's coefficient
+        for v in variables:
+            coefficient *= v.coefficient
+        self.monomial = _monomial(variables)
         self.coefficient = coefficient
-        for i in range(len(self.variables)):
-            self.coefficient *= self.variables[i].coefficient
-            self.variables[i].coefficient = 1
+
+    @staticmethod
+    def from_monomial(monomial, coefficient=1):
+        term = Term.__new__(Term)
+        term.monomial = monomial
+        term.coefficient = coefficient
+        return term
+
+    @property
+    def variables(self):
+        return [Variable(name, power=power) for name, power in self.monomial]
+
+    def to_polynomial(self):
+        return Polynomial({self.monomial: self.coefficient} if self.coefficient != 0 else {})
+
+    def compile(self, variables=None):
+        """Returns a fast evaluator for many points, see `CompiledPolynomial`"""
+        return self.to_polynomial().compile(variables)
 
     def __neg__(self):
-        return Term(self.copy_variables(), coefficient=-self.coefficient)
+        return Term.from_monomial(self.monomial, -self.coefficient)
 
     def __add__(self, other):
         if isinstance(other, Variable):
             other = Term(other)
         
         if isinstance(other, Term):
-            if self.compatible(other.variables):
-                return Term(self.copy_variables(), coefficient=self.coefficient+other.coefficient)
+            if self.monomial == other.monomial:
+                return Term.from_monomial(self.monomial, self.coefficient+other.coefficient)
             else:
-                return Equation([self.copy(), other.copy()])
+                return Equation.from_polynomial(self.to_polynomial() + other.to_polynomial())
 
         elif isinstance(other, Equation):
             return other.__add__(self)
 
         else: # Should be a plain number
-            return Equation(self.copy()).__add__(other)
+            return Equation.from_polynomial(self.to_polynomial() + other)
 
     def __radd__(self, other):
         return self.__add__(other)
@@ -510,19 +3154,9 @@ class Term:
             other = Term(other)
         
         if isinstance(other, Term):
-            new_vars = self.copy_variables()
-            for var in other.variables:
-                exists = False
-                for i in range(len(new_vars)):
-                    if var.name == new_vars[i].name:
-                        exists = True
-                        new_vars[i].power += var.power
-                if not exists:
-                    new_vars.append(var)
-
             new_coefficient = self.coefficient*other.coefficient
             if new_coefficient == 0: return 0
-            return Term(new_vars, coefficient=new_coefficient)
+            return Term.from_monomial(_monomial_mul(self.monomial, other.monomial), new_coefficient)
 
         elif isinstance(other, Equation):
             return other.__mul__(self)
@@ -533,82 +3167,86 @@ class Term:
         else: # Should be a plain number
             new_coefficient = self.coefficient*other
             if new_coefficient == 0: return 0
-            return Term(self.copy_variables(), coefficient=new_coefficient)
+            return Term.from_monomial(self.monomial, new_coefficient)
     
     def __rmul__(self, other):
         return self.__mul__(other)
     
     def __str__(self):
-        res = []
-        for v in self.variables:
-            res.append(str(v))
-        res = " * ".join(res)
+        res = " * ".join(str(v) for v in self.variables)
         if (self.coefficient != 1):
             res = str(self.coefficient) + " * " + res
         return res
 
+    def __eq__(self, other):
+        if isinstance(other, Term):
+            return self.monomial == other.monomial and self.coefficient == other.coefficient
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.monomial, self.coefficient))
+
     def copy_variables(self):
-        return [v.copy() for v in self.variables]
+        return self.variables
 
     def copy(self):
-        return Term(self.copy_variables(), coefficient=self.coefficient)
+        return self
 
     def compatible(self, variables):
-        if len(self.variables) != len(variables): return False
-        for var in self.variables:
-            in_variables = False
-            for other_var in variables:
-                if var == other_var:
-                    in_variables = True
-            if not in_variables:
-                return False
-        return True
+        return self.monomial == _monomial(variables)
 
 
 class Equation:
+    """
+    A sum of `Term`s and a constant, stored as a `Polynomial` (`polynomial`)
+
+    `terms` and `constant` are views of the polynomial: `terms` is rebuilt on every
+    access, so change an equation through its operators or `constant` instead.
+    Equations are values: `+=` and `-=` make a new equation, so ones shared
+    between matrices (or names) never change under you. `copy` is copy-on-write
+    so it's O(1). Use `_sum` to add many of them up without quadratic copying.
+    """
+
     def __init__(self, terms, constant=0):
-        if "__len__" in dir(terms.__class__):
-            self.terms = terms
-        else: # So you can create an Equation from a single term more easily
-            self.terms = [terms]
-        
-        # Convert to Terms if needed
-        if len(self.terms) > 0:
-            if not isinstance(self.terms[0], Term):
-                self.terms = [Term(t) for t in self.terms]
+        if "__len__" not in dir(terms.__class__): # So you can create an Equation from a single term more easily
+            terms = [terms]
+
+        coefficients = {(): constant} if constant != 0 else {}
+        for t in terms:
+            # Convert to Terms if needed
+            if not isinstance(t, Term): t = Term(t)
+            c = coefficients.get(t.monomial, 0) + t.coefficient
+            if c != 0: coefficients[t.monomial] = c
+            else: coefficients.pop(t.monomial, None)
+        self.polynomial = Polynomial(coefficients)
 
-        self.constant = constant
+    @staticmethod
+    def from_polynomial(polynomial):
+        equation = Equation.__new__(Equation)
+        equation.polynomial = polynomial
+        return equation
 
-    def __neg__(self):
-        new_equation = Equation([], constant=-self.constant)
-        for t in self.terms:
-            new_equation.terms.append(-t.copy())
-        return new_equation
+    def to_polynomial(self):
+        return self.polynomial
 
-    def __add__(self, other):
-        if isinstance(other, Variable):
-            other = Term(other)
+    @property
+    def terms(self):
+        return [Term.from_monomial(m, c) for m, c in self.polynomial.coefficients.items() if m != ()]
 
-        if isinstance(other, Term):
-            new_terms = [t.copy() for t in self.terms]
-            for i in range(len(new_terms)):
-                if new_terms[i].compatible(other.variables):
-                    new_terms[i] += other
-                    return Equation(new_terms, constant=self.constant)
-            new_terms.append(other)
-            return Equation(new_terms, constant=self.constant)
+    @property
+    def constant(self):
+        return self.polynomial.constant_term()
 
-        elif isinstance(other, Equation):
-            new_equation = self.copy()
-            for term in other.terms:
-                new_equation += term
-            new_equation.constant += other.constant
-            return new_equation
+    @constant.setter
+    def constant(self, value):
+        self.polynomial = self.polynomial + (value - self.constant)
 
-        else: # Should be a plain number
-            new_equation = self.copy()
-            new_equation.constant += other
-            return new_equation
+    def __neg__(self):
+        return Equation.from_polynomial(-self.polynomial)
+
+    def __add__(self, other):
+        if isinstance(other, (Vector, Matrix)): return NotImplemented
+        return Equation.from_polynomial(self.polynomial + other)
 
     def __radd__(self, other):
         return self.__add__(other)
@@ -620,35 +3258,8 @@ class Equation:
         return (-self).__add__(other)
 
     def __mul__(self, other):
-        # print("mul w/ other", other)
-        if isinstance(other, Variable):
-            other = Term(other)
-
-        if isinstance(other, Equation):
-            new_equation = self.copy()*other.constant # Shouldn't cause a loop because constant multiplication is handled differently
-            for term in other.terms:
-                # print("other equation")
-                # print("ne", new_equation)
-                # print("self", self)
-                new_equation += self * term
-            return new_equation
-
-        elif isinstance(other, Vector) or isinstance(other, Matrix):
-            return NotImplemented
-        
-        else: # Terms and constants have multiplication handled the same way
-            new_equation = Equation([])
-            for i in range(len(self.terms)):
-                # print("self before", self)
-                new_equation += (self.terms[i].copy())*other
-                # print("self after", self)
-                # print("term or const")
-                # print(self.terms[i])
-                # self.terms[i].copy().variables[0] = Variable("y", power=10)
-                # print("ne", new_equation)
-                # print("self", self)
-            new_equation += self.constant * other
-            return new_equation
+        if isinstance(other, (Vector, Matrix)): return NotImplemented
+        return Equation.from_polynomial(self.polynomial * other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
@@ -662,6 +3273,8 @@ class Equation:
         return " + ".join(res)
 
     def copy(self):
-        new_terms = [t.copy() for t in self.terms]
-        return Equation(new_terms, constant=self.constant)
+        return Equation.from_polynomial(self.polynomial.copy())
 
+    def compile(self, variables=None):
+        """Returns a fast evaluator for many points, see `CompiledPolynomial`"""
+        return self.polynomial.compile(variables)